@@ -0,0 +1,204 @@
+"""
+    Offline analytics over harvested records (csv-files and parquet datasets in '<folder>'):
+    files are scanned in chunks, so corpora larger than memory can be analyzed.
+
+    Imports:
+        os: used for finding harvested files
+        concurrent.futures: used for processing files in parallel
+        pandas: used for reading chunks and aggregating them
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Iterator, Iterable
+
+import pandas as pd
+
+try:
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:
+    ds = fs = None
+
+from settings import folder, ANALYTICS_CHUNK
+
+#  values of list columns ('creators', 'keywords') saved by csv writer: "['a', \"b's\"]",
+#  keys of items saved by the first versions of harvest ("[{'creator': 'a'}]") are matched without groups
+LIST_ITEM = r"(?:'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")\s*:|'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\""
+
+
+def find_files(path: str = folder) -> List[str]:
+    """Harvested files in folder: csv-files and folders of parquet datasets
+
+    Parameters:
+        path: folder with harvested files
+    """
+    files = []
+    for entry in sorted(os.scandir(path), key=lambda item: item.name):
+        if entry.is_file() and entry.name.endswith('.csv'):
+            files.append(entry.path)
+        elif entry.is_dir() and any(name.endswith('.parquet') for _, _, names in os.walk(entry.path)
+                                    for name in names):
+            files.append(entry.path)
+    return files
+
+
+def iter_chunks(path: str, columns: Optional[List[str]] = None,
+                chunksize: int = ANALYTICS_CHUNK) -> Iterator[pd.DataFrame]:
+    """Reads harvested file by chunks
+
+    Parameters:
+        path: csv-file or folder of parquet dataset (parquet-files are memory-mapped)
+        columns: columns to read (None - all columns)
+        chunksize: number of records in chunk
+
+    Raises:
+        ImportError: if path is parquet dataset and pyarrow is not installed
+    """
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunksize)
+        return
+    if ds is None:
+        raise ImportError("Install 'pyarrow' package to read records in parquet format")
+    dataset = ds.dataset(path, format='parquet', partitioning='hive',
+                         filesystem=fs.LocalFileSystem(use_mmap=True))
+    for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def explode(column: pd.Series) -> pd.Series:
+    """Values of list column in long format (index - row of chunk), empty strings and missing lists are dropped
+
+    Parameters:
+        column: 'creators' or 'keywords' column (lists or their string representation from csv-files)
+    """
+    column = column.dropna()
+    if column.empty:
+        return pd.Series(dtype=str)
+    if isinstance(column.iloc[0], str):
+        items = column.str.extractall(LIST_ITEM)
+        values = items[0].fillna(items[1]).str.replace(r'\\(.)', r'\1', regex=True)
+        values.index = values.index.droplevel(1)
+    else:
+        values = column.explode()
+        #  items saved by the first versions of harvest
+        values = values.map(lambda value: list(value.values()) if isinstance(value, dict) else value).explode()
+    values = values.dropna()
+    return values[values != ''].astype(str)
+
+
+def _add(counts: Optional[pd.Series], part: pd.Series) -> pd.Series:
+    """Sums two series of counts (None - no counts yet)"""
+    return part if counts is None else counts.add(part, fill_value=0)
+
+
+def _count_file(path: str, aggregation: str, chunksize: int, keywords: Optional[List[str]] = None) -> pd.Series:
+    """Counts of one file (module-level to be run in process pool)
+
+    Parameters:
+        path: harvested file
+        aggregation: name of aggregation ('keywords', 'creators', 'journal_by_year', 'cooccurrence')
+        chunksize: number of records in chunk
+        keywords: keywords taken into account by 'cooccurrence'
+
+    Return:
+        counts (index - value or pair of values)
+    """
+    column = {'keywords': ['keywords'], 'creators': ['creators'], 'cooccurrence': ['keywords'],
+              'journal_by_year': ['source/applicant', 'publication_date']}[aggregation]
+    counts = None
+    for chunk in iter_chunks(path, column, chunksize):
+        if aggregation in ('keywords', 'creators'):
+            part = explode(chunk[aggregation]).value_counts()
+        elif aggregation == 'journal_by_year':
+            part = chunk.groupby([chunk['source/applicant'], chunk['publication_date'].str[:4].rename('year')]). \
+                size()
+        else:
+            values = explode(chunk['keywords'])
+            values = values[values.isin(keywords)]
+            pairs = values.to_frame('first').join(values.rename('second'))
+            pairs = pairs[pairs['first'] < pairs['second']]
+            part = pairs.groupby(['first', 'second']).size()
+        counts = _add(counts, part)
+    return pd.Series(dtype='int64') if counts is None else counts.astype('int64')
+
+
+class CorpusAnalytics:
+    """Aggregations over harvested records which facets of API don't give:
+    counts of keywords and creators, co-occurrence of keywords, journals by years
+
+    Files are read by chunks (parquet-files are memory-mapped), aggregations of chunks are summed,
+    so memory depends on chunk size and number of distinct values, not on size of corpus.
+    Several files can be processed in parallel by pool of processes.
+
+    Methods:
+        keyword_counts():
+            Numbers of records by keywords
+        creator_counts():
+            Numbers of records by creators
+        keyword_cooccurrence(top):
+            Numbers of records with both keywords for the most frequent keywords
+        journal_by_year():
+            Numbers of records by journals (rows) and years (columns)
+
+    Examples:
+        Analyze all harvested files with 4 processes:
+            analytics = CorpusAnalytics(processes=4)
+            analytics.keyword_counts().head(20)
+            analytics.keyword_cooccurrence(top=30)
+    """
+
+    def __init__(self, files: Optional[Iterable[str]] = None, chunksize: int = ANALYTICS_CHUNK,
+                 processes: Optional[int] = None):
+        """Initialize method
+
+        Parameters:
+            files: harvested csv-files and folders of parquet datasets (None as default - all files in '<folder>')
+            chunksize: number of records read at once
+            processes: number of processes for parallel processing of files (None as default - current process)
+        """
+        self.files = list(files) if files is not None else find_files()
+        self.chunksize = chunksize
+        self.processes = processes
+
+    def __count(self, aggregation: str, **params) -> pd.Series:
+        """Sums counts of all files"""
+        if self.processes and len(self.files) > 1:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                parts = list(executor.map(_count_file, self.files, [aggregation] * len(self.files),
+                                          [self.chunksize] * len(self.files),
+                                          [params.get('keywords')] * len(self.files)))
+        else:
+            parts = [_count_file(path, aggregation, self.chunksize, **params) for path in self.files]
+        counts = None
+        for part in parts:
+            counts = _add(counts, part)
+        return pd.Series(dtype='int64') if counts is None else counts.astype('int64')
+
+    def keyword_counts(self) -> pd.Series:
+        """Numbers of records by keywords (the most frequent first)"""
+        return self.__count('keywords').sort_values(ascending=False).rename('count')
+
+    def creator_counts(self) -> pd.Series:
+        """Numbers of records by creators (the most frequent first)"""
+        return self.__count('creators').sort_values(ascending=False).rename('count')
+
+    def keyword_cooccurrence(self, top: int = 50) -> pd.DataFrame:
+        """Numbers of records with both keywords (symmetric matrix)
+
+        Parameters:
+            top: number of the most frequent keywords in matrix
+        """
+        keywords = self.keyword_counts().index[:top].tolist()
+        pairs = self.__count('cooccurrence', keywords=keywords)
+        matrix = pairs.unstack(fill_value=0).reindex(index=keywords, columns=keywords, fill_value=0) \
+            if not pairs.empty else pd.DataFrame(0, index=keywords, columns=keywords)
+        return (matrix + matrix.T).astype('int64')
+
+    def journal_by_year(self) -> pd.DataFrame:
+        """Numbers of records by journals (rows, the biggest first) and years (columns)"""
+        counts = self.__count('journal_by_year')
+        if counts.empty:
+            return pd.DataFrame(dtype='int64')
+        matrix = counts.unstack(fill_value=0)
+        matrix = matrix.reindex(columns=sorted(matrix.columns))
+        return matrix.loc[matrix.sum(axis=1).sort_values(ascending=False).index].astype('int64')
@@ -0,0 +1,137 @@
+"""
+    Throughput benchmarks of SpringerSearch against local mock of Springer API (mock_server.py),
+    so performance changes can be compared offline without spending API quota.
+
+    Usage:
+        python benchmark.py --total 20000 --latency 0.05 --output bench.json
+
+    Imports:
+        os: used for interact with file system
+        sys: used for checking platform
+        json: used for saving results
+        time: used for measuring duration
+        tempfile: used for running benchmarks in temporary folder
+        argparse: used for parsing command line arguments
+        contextlib: used for hiding output of benchmarks
+        multiprocessing: used for running every benchmark in separate process (for peak RSS)
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import contextlib
+import multiprocessing
+from typing import Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from mock_server import MockSpringerAPI
+
+#  benchmarked methods
+SCENARIOS = ('get_all_records', 'collect_statistic_by_years', 'create_dataframe_by_category')
+
+
+def percentile(values: list, share: float) -> Optional[float]:
+    """Percentile of values (nearest rank)
+
+    Parameters:
+        values: measured values
+        share: percentile from 0 to 1 (0.5 - median)
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(share * len(values)) - 1))]
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of current process in bytes"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #  kilobytes on Linux, bytes on macOS
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def run_scenario(scenario: str, api_url: str, options: dict) -> dict:
+    """Runs one benchmark (in separate process)
+
+    Parameters:
+        scenario: name of benchmarked method
+        api_url: URL of mock server
+        options: parameters of benchmark (workers, years, etc.)
+
+    Return:
+        dictionary with measured values
+    """
+    os.chdir(tempfile.mkdtemp(prefix='springer_bench_'))
+    from springer_search import SpringerSearch, create_session
+    from ratelimit import RateLimiter
+
+    #  latency of every request
+    latencies = []
+    session = create_session(options['workers'])
+    session.hooks['response'].append(lambda response, *args, **kwargs:
+                                     latencies.append(response.elapsed.total_seconds()))
+    spr = SpringerSearch('Benchmark', options['workers'], use_cache=False, session=session,
+                         rate_limiter=RateLimiter(rate=1e9, burst=10 ** 6, daily_limit=None),
+                         api_url=api_url, token='benchmark')
+    records = 0
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if scenario == 'get_all_records':
+            records = spr.get_all_records('subject:"Physics"', options['records'], sink=options['sink'])
+        elif scenario == 'collect_statistic_by_years':
+            spr.collect_statistic_by_years('Physics', 'all', options['from_year'], options['to_year'])
+        else:
+            for year in range(options['from_year'], options['to_year'] + 1):
+                spr.create_dataframe_by_category('all', year=year)
+    seconds = time.perf_counter() - start
+    return {'scenario': scenario, 'seconds': round(seconds, 3), 'records': records,
+            'requests': len(latencies),
+            'records_per_sec': round(records / seconds, 1),
+            'requests_per_sec': round(len(latencies) / seconds, 1),
+            'p50_latency_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+            'p99_latency_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            'peak_rss_mb': round(peak_rss() / 1024 ** 2, 1) if resource else None,
+            #  total seconds of every phase (network, decoding, parsing, writing)
+            **{f'{name}_sec': round(timer['total'], 3) for name, timer in spr.metrics.snapshot()['timers'].items()}}
+
+
+def main(args: Optional[list] = None):
+    """Runs benchmarks from command line"""
+    parser = argparse.ArgumentParser(description='Benchmarks of SpringerSearch against mock Springer API')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--total', type=int, default=20000, help='number of records in mock API')
+    parser.add_argument('--records', type=int, default=None, help="limit of records for 'get_all_records'")
+    parser.add_argument('--latency', type=float, default=0.05, help='delay of mock response in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of error response')
+    parser.add_argument('--workers', type=int, default=8, help='number of concurrent requests')
+    parser.add_argument('--sink', default='csv', help="format of saved records ('csv' or 'parquet')")
+    parser.add_argument('--from-year', type=int, default=2003)
+    parser.add_argument('--to-year', type=int, default=2022)
+    parser.add_argument('--output', help='json-file to save results')
+    options = parser.parse_args(args)
+    params = {'workers': options.workers, 'records': options.records, 'sink': options.sink,
+              'from_year': options.from_year, 'to_year': options.to_year}
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with MockSpringerAPI(total=options.total, latency=options.latency, error_rate=options.error_rate) as api:
+        for scenario in options.scenarios:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_scenario, (scenario, api.url, params))
+            results.append(result)
+            print(' '.join(f'{key}={value}' for key, value in result.items()))
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump({'params': vars(options), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
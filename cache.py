@@ -0,0 +1,168 @@
+"""
+    Imports:
+        os: used for interact with file system
+        time: used for checking the age of cached responses
+        hashlib: used for creating names of cache files
+        threading: used for safe access to cache from several threads
+"""
+import os
+import time
+import hashlib
+import threading
+from typing import Optional
+
+from settings import folder, API_URL, CACHE_TTL, CACHE_SIZE
+
+
+class ResponseCache:
+    """Persistent on-disk cache of Springer API responses
+
+    Each response is stored in a separate file, named by hash of API URL, normalized query,
+    offset and page size (so responses of mock server and of Springer API are never mixed).
+    File modification time is the time the response was saved (used for TTL),
+    access time is updated on every hit (used for LRU eviction).
+
+    Methods:
+        get(query, start_from, res_count, api_url):
+            Returns cached response or None (if there is no response or it is expired)
+        put(query, start_from, res_count, content, api_url):
+            Saves response to cache and evicts the least recently used responses
+            if cache size exceeds the budget
+        clear():
+            Removes all cached responses
+        stats:
+            Dictionary with hit/miss counters and current size of cache
+    """
+
+    def __init__(self, path: str = os.path.join(folder, 'cache'),
+                 ttl: Optional[float] = CACHE_TTL, max_size: int = CACHE_SIZE):
+        """Initialize method
+
+        Parameters:
+            path: folder to store cached responses
+            ttl: time to live of cached response in seconds (None - responses never expire)
+            max_size: limit on total size of cached responses in bytes
+        """
+        self.__path = path
+        self.__ttl = ttl
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        #  counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.__path, exist_ok=True)
+        #  current size of cache
+        self.__size = sum(entry.stat().st_size for entry in self.__entries())
+
+    @staticmethod
+    def make_key(query: str, start_from: int, res_count: int, api_url: str = API_URL) -> str:
+        """Creates key of response by API URL, normalized query, offset and page size
+
+        Parameters:
+            query: query-string
+            start_from: number of the first record in response
+            res_count: number of records in response
+            api_url: URL of API which returned response
+
+        Return:
+            hex digest used as name of cache file
+        """
+        #  the same query can be written with URL-coded '&' and different spaces
+        normalized = ' '.join(query.replace('%26', '&').split())
+        key = f'{api_url}|{normalized}|{int(start_from)}|{int(res_count)}'
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    @property
+    def stats(self) -> dict:
+        """Counters of cache usage"""
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': self.__size}
+
+    def __entries(self):
+        """Iterate over cache files"""
+        with os.scandir(self.__path) as entries:
+            return [entry for entry in entries if entry.is_file() and entry.name.endswith('.json')]
+
+    def __file(self, key: str) -> str:
+        """Path to cache file by key"""
+        return os.path.join(self.__path, f'{key}.json')
+
+    def get(self, query: str, start_from: int, res_count: int, api_url: str = API_URL) -> Optional[bytes]:
+        """Returns cached response
+
+        Parameters:
+            query: query-string
+            start_from: number of the first record in response
+            res_count: number of records in response
+            api_url: URL of API
+
+        Return:
+            raw content of response or None if it isn't cached or expired
+        """
+        filename = self.__file(self.make_key(query, start_from, res_count, api_url))
+        with self.__lock:
+            try:
+                saved_at = os.stat(filename).st_mtime
+                if self.__ttl is not None and time.time() - saved_at > self.__ttl:
+                    self.__remove(filename)
+                    self.misses += 1
+                    return None
+                with open(filename, 'rb') as file:
+                    content = file.read()
+                #  mark as recently used, keep the time of saving
+                os.utime(filename, (time.time(), saved_at))
+            except OSError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return content
+
+    def put(self, query: str, start_from: int, res_count: int, content: bytes, api_url: str = API_URL):
+        """Saves response to cache
+
+        Parameters:
+            query: query-string
+            start_from: number of the first record in response
+            res_count: number of records in response
+            content: raw content of response
+            api_url: URL of API which returned response
+        """
+        if len(content) > self.__max_size:
+            return
+        filename = self.__file(self.make_key(query, start_from, res_count, api_url))
+        with self.__lock:
+            if os.path.exists(filename):
+                self.__remove(filename)
+            #  write to temporary file first, so another reader never gets a partial response
+            tmp_name = f'{filename}.{threading.get_ident()}.tmp'
+            with open(tmp_name, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_name, filename)
+            self.__size += len(content)
+            if self.__size > self.__max_size:
+                self.__evict()
+
+    def clear(self):
+        """Removes all cached responses"""
+        with self.__lock:
+            for entry in self.__entries():
+                self.__remove(entry.path)
+
+    def __remove(self, filename: str):
+        """Removes cache file and updates size of cache"""
+        try:
+            size = os.stat(filename).st_size
+            os.remove(filename)
+        except OSError:
+            return
+        self.__size -= size
+
+    def __evict(self):
+        """Removes the least recently used responses until cache size fits the budget"""
+        entries = sorted(self.__entries(), key=lambda entry: entry.stat().st_atime)
+        for entry in entries:
+            if self.__size <= self.__max_size:
+                break
+            self.__remove(entry.path)
+            self.evictions += 1
@@ -0,0 +1,136 @@
+"""
+    Imports:
+        os: used for interact with file system
+        json: used for storing checkpoints
+        hashlib: used for creating fingerprint of query
+        threading: used for safe updating of watermarks from several threads
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import Optional
+
+from settings import folder
+
+
+class Checkpoint:
+    """Progress of harvest by one query, stored in '<folder>/checkpoints' folder
+
+    Checkpoint stores the offset of the next page, number of saved records,
+    output file and position of writer (returned by its 'position' method) after the last flush.
+    Writer must be flushed before checkpoint is saved: after restart writer is rolled back
+    to the saved position, so records written after the last checkpoint are neither lost nor duplicated.
+
+    Methods:
+        load():
+            Returns saved state if it was saved for the same query (fingerprint)
+        save(**state):
+            Saves state atomically
+        remove():
+            Removes checkpoint
+    """
+
+    def __init__(self, name: str, query: str, **params):
+        """Initialize method
+
+        Parameters:
+            name: name of checkpoint file (without extension)
+            query: query-string of harvest
+            params: other parameters of harvest which must be the same to continue it (limit, format, etc.)
+        """
+        path = os.path.join(folder, 'checkpoints')
+        os.makedirs(path, exist_ok=True)
+        self.filename = os.path.join(path, f'{name}.json')
+        self.query = query
+        self.fingerprint = self.make_fingerprint(query, **params)
+
+    @staticmethod
+    def make_fingerprint(query: str, **params) -> str:
+        """Creates fingerprint of harvest by normalized query and parameters"""
+        normalized = ' '.join(query.replace('%26', '&').split())
+        return hashlib.sha1(json.dumps([normalized, params], sort_keys=True).encode('utf-8')).hexdigest()
+
+    def load(self) -> Optional[dict]:
+        """Returns saved state
+
+        Return:
+            dictionary with state or None if there is no checkpoint for this query
+        """
+        try:
+            with open(self.filename, encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if state.get('fingerprint') != self.fingerprint:
+            return None
+        return state
+
+    def save(self, **state):
+        """Saves state of harvest (offset, saved, output, position, etc.)
+
+        Parameters:
+            state: values to be saved
+        """
+        state.update(query=self.query, fingerprint=self.fingerprint)
+        tmp_name = f'{self.filename}.tmp'
+        with open(tmp_name, 'w', encoding='utf-8') as file:
+            json.dump(state, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_name, self.filename)
+
+    def remove(self):
+        """Removes checkpoint"""
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+class Watermarks:
+    """The latest online dates of records received by sync of every query, stored in '<folder>/watermarks.json'
+
+    Methods:
+        get(query):
+            Returns watermark of query or None
+        set(query, date):
+            Saves watermark of query atomically
+    """
+    #  watermarks of all queries are stored in one file
+    _lock = threading.Lock()
+
+    def __init__(self, path: str = os.path.join(folder, 'watermarks.json')):
+        """Initialize method
+
+        Parameters:
+            path: file to store watermarks
+        """
+        self.filename = path
+
+    def __load(self) -> dict:
+        """Loads watermarks of all queries"""
+        try:
+            with open(self.filename, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, query: str) -> Optional[str]:
+        """Returns watermark of query (online date in 'y-m-d' format) or None if query wasn't synced"""
+        return self.__load().get(query) or None
+
+    def set(self, query: str, date: str):
+        """Saves watermark of query
+
+        Parameters:
+            query: query-string of sync
+            date: the latest online date of received records
+        """
+        with self._lock:
+            watermarks = self.__load()
+            watermarks[query] = date
+            tmp_name = f'{self.filename}.tmp'
+            with open(tmp_name, 'w', encoding='utf-8') as file:
+                json.dump(watermarks, file, ensure_ascii=False, indent=1)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_name, self.filename)
@@ -0,0 +1,240 @@
+"""
+    Command line interface: runs harvest, sync and statistics jobs from JSON/YAML job file or arguments.
+    Heavy packages (pandas, pyarrow) are imported only by jobs which need them,
+    so short harvest jobs (e.g. from cron) start fast.
+
+    Usage:
+        python cli.py run jobs.yaml
+        python cli.py harvest 'subject:"Physics" year:"2021"' --total 1000 --sink parquet
+        python cli.py sync 'subject:"Physics"'
+        python cli.py stats Physics --category country keyword --from 2015 --output stats/physics
+
+    Job file (JSON or YAML, requires PyYAML):
+        workers: 4                  # harvest jobs running concurrently (optional)
+        page_workers: 8             # pages requested concurrently by every job (optional)
+        api_url: http://127.0.0.1:8000/metadata/json   # URL of API, e.g. of mock server (optional)
+        token: test                 # API key (optional, 'TOKEN' from 'api_token.py' as default)
+        jobs:
+          - query: 'subject:"Physics" year:"2021"'
+            total: 1000
+            sink: parquet
+            priority: 1
+            dedup: true
+            resume: false           # harvest again if the job was completed (default: true)
+          - type: sync
+            query: {subject: Physics, onlinedatefrom: '2020-01-01'}
+          - type: stats
+            discipline: Physics
+            category: [country, keyword]
+            from: 2015
+            output: stats/physics   # 'stats/physics_country.csv', 'stats/physics_keyword.csv'
+
+    Imports:
+        os: used for creating folders of statistics
+        sys: used for exit code
+        json: used for reading job files and printing results
+        time: used for measuring duration of jobs
+        argparse: used for parsing command line arguments
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Optional, List
+
+from settings import WORKERS, JOB_WORKERS, API_URL, categories
+
+#  parameters of job file (other parameters are errors)
+SPEC_PARAMS = {'jobs', 'workers', 'page_workers', 'api_url', 'token'}
+#  types of jobs and their parameters (other parameters of job are errors)
+JOB_PARAMS = {'harvest': {'query', 'total', 'sink', 'priority', 'dedup', 'resume'},
+              'sync': {'query', 'sink', 'overlap'},
+              'stats': {'discipline', 'category', 'from', 'to', 'refresh', 'output'}}
+
+
+def load_jobs(filename: str) -> dict:
+    """Reads job file
+
+    Parameters:
+        filename: JSON or YAML (.yaml/.yml) file with jobs
+
+    Raises:
+        ValueError: if file has wrong structure
+        ImportError: if file is YAML and PyYAML isn't installed
+    """
+    with open(filename, encoding='utf-8') as file:
+        if filename.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Install 'PyYAML' package to read YAML job files") from None
+            spec = yaml.safe_load(file)
+        else:
+            spec = json.load(file)
+    if isinstance(spec, list):
+        spec = {'jobs': spec}
+    if not isinstance(spec, dict) or not isinstance(spec.get('jobs'), list):
+        raise ValueError(f"Job file '{filename}' must contain list of jobs")
+    unknown = set(spec) - SPEC_PARAMS
+    if unknown:
+        raise ValueError(f"Job file '{filename}' has unknown parameters: {sorted(unknown)}. "
+                         f"Possible parameters: {sorted(SPEC_PARAMS)}")
+    for number, job in enumerate(spec['jobs'], 1):
+        if not isinstance(job, dict):
+            raise ValueError(f"Job {number} must be a mapping of parameters")
+        kind = job.get('type', 'harvest')
+        if kind not in JOB_PARAMS:
+            raise ValueError(f"Job {number} has wrong type '{kind}'. Possible types: {list(JOB_PARAMS)}")
+        unknown = set(job) - JOB_PARAMS[kind] - {'type'}
+        if unknown:
+            raise ValueError(f"Job {number} ({kind}) has unknown parameters: {sorted(unknown)}")
+        required = 'discipline' if kind == 'stats' else 'query'
+        if required not in job:
+            raise ValueError(f"Job {number} ({kind}) must have '{required}' parameter")
+    return spec
+
+
+def run_jobs(spec: dict) -> List[dict]:
+    """Runs jobs: harvest jobs concurrently (HarvestScheduler), then sync and statistics jobs one by one
+
+    Parameters:
+        spec: dictionary with 'jobs' list and optional 'workers', 'page_workers', 'api_url', 'token' keys
+
+    Return:
+        results of jobs in order of jobs: dictionaries with 'job', 'status' ('done' or 'failed'),
+        'saved' (number of records or names of files), 'seconds' and 'error' keys
+    """
+    from scheduler import HarvestScheduler, HarvestJob
+    from springer_search import SpringerSearch
+    from ratelimit import RateLimiter
+
+    api = {'api_url': spec.get('api_url', API_URL), 'token': spec.get('token')}
+    page_workers = spec.get('page_workers', WORKERS)
+    #  all jobs share limits of API key
+    rate_limiter = RateLimiter.default()
+    scheduler = HarvestScheduler(spec.get('workers', JOB_WORKERS), page_workers, rate_limiter, **api)
+    spr = SpringerSearch('CLI', page_workers, rate_limiter=rate_limiter, **api)
+    jobs = spec['jobs']
+
+    def query(job: dict) -> str:
+        """Query-string of job (query can be given by constraints)"""
+        return spr.create_query(**job['query']) if isinstance(job['query'], dict) else job['query']
+
+    results = [None] * len(jobs)
+    harvests = [i for i, job in enumerate(jobs) if job.get('type', 'harvest') == 'harvest']
+    if harvests:
+        harvest_jobs = [HarvestJob(query(jobs[i]), jobs[i].get('total'), jobs[i].get('sink', 'csv'),
+                                   jobs[i].get('priority', 0), jobs[i].get('dedup', False), jobs[i].get('resume', True))
+                        for i in harvests]
+        for i, result in zip(harvests, scheduler.run(harvest_jobs)):
+            results[i] = dict(result, job='harvest')
+    for i, job in enumerate(jobs):
+        if results[i] is not None:
+            continue
+        start = time.monotonic()
+        result = {'job': job['type'], 'query': job.get('query', job.get('discipline')),
+                  'status': 'done', 'saved': None, 'error': None}
+        try:
+            if job['type'] == 'sync':
+                result['saved'] = spr.sync_records(query(job), job.get('sink', 'csv'),
+                                                   **({'overlap': job['overlap']} if 'overlap' in job else {}))
+            else:
+                result['saved'] = save_statistic(spr, job)
+        except Exception as exc:
+            spr.add_log(f"Job {i + 1} ({job['type']}) failed: {exc}", 'ERROR')
+            result.update(status='failed', error=str(exc))
+        result['seconds'] = time.monotonic() - start
+        results[i] = result
+    return results
+
+
+def save_statistic(spr, job: dict) -> List[str]:
+    """Collects statistic by years and saves it to csv-files (one file per category)
+
+    Parameters:
+        spr: SpringerSearch instance
+        job: parameters of statistics job
+
+    Return:
+        names of saved files
+    """
+    category = job.get('category', 'subject')
+    frames = spr.collect_statistic_by_years(job['discipline'], category, job.get('from', 2003),
+                                            job.get('to'), refresh=job.get('refresh', False))
+    if not isinstance(frames, dict):
+        frames = {category: frames}
+    output = job.get('output') or f"statistic_{job['discipline']}".replace(' ', '_')
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    files = []
+    for catg, frame in frames.items():
+        files.append(f'{output}_{catg}.csv')
+        frame.to_csv(files[-1], index=False)
+    return files
+
+
+def main(args: Optional[list] = None) -> int:
+    """Runs jobs from command line
+
+    Return:
+        exit code: 0 if all jobs are done, 1 if any job failed
+    """
+    parser = argparse.ArgumentParser(description='Harvests and statistics of Springer API')
+    parser.add_argument('--workers', type=int, help='number of harvest jobs running concurrently')
+    parser.add_argument('--page-workers', type=int, help='number of pages requested concurrently by every job')
+    parser.add_argument('--api-url', help='URL of Springer API (e.g. URL of mock server)')
+    parser.add_argument('--token', help="API key ('TOKEN' from 'api_token.py' as default)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run jobs from JSON/YAML job file')
+    run.add_argument('file')
+    harvest = commands.add_parser('harvest', help='save records by query (get_all_records)')
+    harvest.add_argument('query')
+    harvest.add_argument('--total', type=int)
+    harvest.add_argument('--sink', default='csv', choices=['csv', 'parquet'])
+    harvest.add_argument('--dedup', action='store_true', help='skip records saved by other harvests')
+    harvest.add_argument('--no-resume', dest='resume', action='store_false',
+                         help='harvest again if the same harvest was completed')
+    sync = commands.add_parser('sync', help='save records appeared online since the previous sync (sync_records)')
+    sync.add_argument('query')
+    sync.add_argument('--sink', default='csv', choices=['csv', 'parquet'])
+    sync.add_argument('--overlap', type=int, help='number of days before watermark requested again')
+    stats = commands.add_parser('stats', help='save statistics by years (collect_statistic_by_years)')
+    stats.add_argument('discipline')
+    stats.add_argument('--category', nargs='+', default=['subject'], choices=list(categories) + ['all'])
+    stats.add_argument('--from', dest='from_', type=int, default=2003)
+    stats.add_argument('--to', type=int)
+    stats.add_argument('--refresh', action='store_true', help='request closed years again')
+    stats.add_argument('--output', help='prefix of csv-files')
+    options = parser.parse_args(args)
+
+    try:
+        if options.command == 'run':
+            spec = load_jobs(options.file)
+        elif options.command == 'harvest':
+            spec = {'jobs': [{'query': options.query, 'total': options.total, 'sink': options.sink,
+                              'dedup': options.dedup, 'resume': options.resume}]}
+        elif options.command == 'sync':
+            job = {'type': 'sync', 'query': options.query, 'sink': options.sink}
+            if options.overlap is not None:
+                job['overlap'] = options.overlap
+            spec = {'jobs': [job]}
+        else:
+            category = options.category[0] if len(options.category) == 1 else options.category
+            spec = {'jobs': [{'type': 'stats', 'discipline': options.discipline, 'category': category,
+                              'from': options.from_, 'to': options.to, 'refresh': options.refresh,
+                              'output': options.output}]}
+    except (OSError, ValueError, ImportError) as exc:
+        parser.error(str(exc))
+    for key in ('workers', 'page_workers', 'api_url', 'token'):
+        if getattr(options, key) is not None:
+            spec[key] = getattr(options, key)
+
+    results = run_jobs(spec)
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False, default=str))
+    return int(any(result['status'] == 'failed' for result in results))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+    Imports:
+        re: used for skipping whitespaces between JSON values
+        json: used for decoding responses (if orjson isn't installed)
+"""
+import re
+import json
+from typing import Any, Union, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#  decoder of single JSON values (used for streaming)
+DECODER = json.JSONDecoder()
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def loads(content: Union[bytes, str]) -> Any:
+    """Decodes JSON from raw bytes of response (with orjson if it is installed)
+
+    Parameters:
+        content: raw content of response
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class StreamedPage:
+    """Response of Springer API with lazily decoded records
+
+    Values of the response before 'records' array (e.g. 'result') are decoded at once,
+    records are decoded one by one while iterating over page['records'], so the list
+    of all records of the page is never built. Values after the array (e.g. 'facets')
+    are decoded on first access. Records can be iterated only once.
+    Decoded text of the whole response is kept until the object is decoded to the end,
+    so memory of page is about size of response.
+
+    Examples:
+        page = StreamedPage(response.content)
+        total = int(page['result'][0]['total'])
+        for record in page['records']:
+            ...
+    """
+
+    def __init__(self, content: Union[bytes, str], key: str = 'records'):
+        """Initialize method
+
+        Parameters:
+            content: raw content of response (JSON object)
+            key: name of streamed array
+
+        Raises:
+            ValueError: if content isn't valid JSON object (up to streamed array)
+        """
+        self.__text = content.decode('utf-8') if isinstance(content, bytes) else content
+        self.__key = key
+        #  decoded values of object
+        self.__values = {}
+        #  position of streamed array (None if there is no array or it is already passed)
+        self.__array = None
+        #  position of the next value of object (None if the whole object is decoded)
+        self.__pos = self.__skip(0)
+        self.__expect('{')
+        self.__pos = self.__skip(self.__pos + 1)
+        if self.__text.startswith('}', self.__pos):
+            self.__pos = None
+        self.__read_values()
+
+    def __skip(self, pos: int) -> int:
+        """Position of the first non-whitespace character from pos"""
+        return WHITESPACE.match(self.__text, pos).end()
+
+    def __expect(self, char: str, pos: int = None):
+        """Checks character at position"""
+        pos = self.__pos if pos is None else pos
+        if not self.__text.startswith(char, pos):
+            raise ValueError(f"Expecting '{char}' at position {pos}")
+
+    def __read_values(self):
+        """Decodes values of object until streamed array or end of object"""
+        text = self.__text
+        while self.__pos is not None:
+            name, pos = DECODER.raw_decode(text, self.__pos)
+            pos = self.__skip(pos)
+            self.__expect(':', pos)
+            pos = self.__skip(pos + 1)
+            if name == self.__key and text.startswith('[', pos):
+                self.__array = pos
+                self.__pos = None
+                return
+            self.__values[name], pos = DECODER.raw_decode(text, pos)
+            self.__next_value(pos)
+        #  text isn't needed after the end of object
+        self.__text = ''
+
+    def __next_value(self, pos: int):
+        """Moves to the next value of object after value ending at pos"""
+        pos = self.__skip(pos)
+        if self.__text.startswith('}', pos):
+            self.__pos = None
+        else:
+            self.__expect(',', pos)
+            self.__pos = self.__skip(pos + 1)
+
+    def __iter_array(self) -> Iterator[Any]:
+        """Decodes items of streamed array one by one"""
+        text = self.__text
+        pos, self.__array = self.__array, None
+        if pos is None:
+            return
+        pos = self.__skip(pos + 1)
+        if text.startswith(']', pos):
+            pos += 1
+        else:
+            while True:
+                item, pos = DECODER.raw_decode(text, pos)
+                yield item
+                pos = self.__skip(pos)
+                if text.startswith(']', pos):
+                    pos += 1
+                    break
+                self.__expect(',', pos)
+                pos = self.__skip(pos + 1)
+        #  values after array
+        self.__next_value(pos)
+        self.__read_values()
+
+    def __read_all(self):
+        """Decodes the rest of object (items of streamed array are skipped)"""
+        for _ in self.__iter_array():
+            pass
+
+    def __getitem__(self, key: str) -> Any:
+        if key == self.__key:
+            return self.__iter_array()
+        if key not in self.__values:
+            self.__read_all()
+        return self.__values[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Value of response by key (iterator of items for streamed array)"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
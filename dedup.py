@@ -0,0 +1,200 @@
+"""
+    Imports:
+        os: used for interact with file system
+        re: used for finding DOI in URL of record
+        math: used for calculating size of Bloom filter
+        sqlite3: used for storing keys of saved records
+        hashlib: used for hashing keys in Bloom filter
+        threading: used for safe access to index from several threads
+"""
+import os
+import re
+import math
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Hashable, Iterable, List
+
+from settings import folder, DEDUP_CAPACITY, DEDUP_ERROR_RATE
+
+
+class BloomFilter:
+    """In-memory Bloom filter: answers 'definitely not added' or 'possibly added'
+
+    Methods:
+        add(key):
+            Adds key to filter
+        __contains__(key):
+            Returns False if key was definitely not added
+    """
+
+    def __init__(self, capacity: int = DEDUP_CAPACITY, error_rate: float = DEDUP_ERROR_RATE):
+        """Initialize method
+
+        Parameters:
+            capacity: expected number of keys
+            error_rate: probability of false positive answer for expected number of keys
+        """
+        self.__size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.__hashes = max(1, round(self.__size / capacity * math.log(2)))
+        self.__bits = bytearray((self.__size + 7) // 8)
+
+    def __positions(self, key: str):
+        """Positions of bits for key (double hashing)"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return ((first + i * second) % self.__size for i in range(self.__hashes))
+
+    def add(self, key: str):
+        """Adds key to filter"""
+        for position in self.__positions(key):
+            self.__bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.__bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(key))
+
+
+class DedupIndex:
+    """Persistent index of saved records (by DOI or URL) used for skipping duplicates between harvests
+
+    Keys are stored in SQLite table '<folder>/dedup.sqlite', Bloom filter in front of it
+    answers most lookups of new records without reading the table.
+    Added keys are kept in memory by owner (harvest) and become persistent only after 'commit' of the owner
+    (get_all_records commits them together with checkpoint), so concurrent harvests sharing index
+    don't commit or roll back keys of each other.
+
+    Methods:
+        get_key(record):
+            Returns DOI or URL of record from API response
+        get_url_keys(url):
+            Returns possible keys of saved record by its URL
+        update(keys):
+            Adds keys of records saved before (they are committed at once)
+        add(key, owner):
+            Adds key to index, returns False if key is already in index
+        commit(owner):
+            Saves keys added by owner
+        rollback(owner):
+            Forgets keys added by owner after its last commit
+        close():
+            Commits keys and closes the index
+    """
+
+    def __init__(self, path: str = os.path.join(folder, 'dedup.sqlite'), bloom: bool = True,
+                 capacity: int = DEDUP_CAPACITY):
+        """Initialize method
+
+        Parameters:
+            path: path to SQLite database
+            bloom: use in-memory Bloom filter in front of database (True as default)
+            capacity: expected number of keys (for Bloom filter)
+        """
+        self.__lock = threading.Lock()
+        #  keys which are not committed by owners
+        self.__pending = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS records (key TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.__connection.commit()
+        self.__bloom = None
+        if bloom:
+            self.__bloom = BloomFilter(capacity)
+            for key, in self.__connection.execute('SELECT key FROM records'):
+                self.__bloom.add(key)
+
+    @staticmethod
+    def get_key(record: dict) -> Optional[str]:
+        """Returns key of record: DOI or URL (None if record has neither)
+
+        Parameters:
+            record: dictionary with all info about record
+        """
+        if record.get('doi'):
+            return f"doi:{record['doi'].strip().lower()}"
+        if record.get('url'):
+            return f"url:{record['url'][0]['value'].strip()}"
+        return None
+
+    @staticmethod
+    def get_url_keys(url: str) -> List[str]:
+        """Returns possible keys of saved record by its URL (saved files have URL of record, but not its DOI):
+        URL key and DOI key for URL of DOI resolver
+
+        Parameters:
+            url: URL of record ('url' column of saved file)
+        """
+        url = url.strip()
+        doi = re.match(r'https?://(?:dx\.)?doi\.org/(.+)', url)
+        return [f'url:{url}'] + ([f'doi:{doi.group(1).lower()}'] if doi else [])
+
+    def update(self, keys: Iterable[str]):
+        """Adds keys of records saved before (e.g. keys of records in file), keys are committed at once
+
+        Parameters:
+            keys: keys of records
+        """
+        with self.__lock, self.__connection:
+            for key in keys:
+                self.__connection.execute('INSERT OR IGNORE INTO records (key) VALUES (?)', (key,))
+                if self.__bloom is not None:
+                    self.__bloom.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self.__lock:
+            return self.__contains(key)
+
+    def __contains(self, key: str) -> bool:
+        """Checks key without lock (keys added by all harvests, including not committed ones)"""
+        if self.__bloom is not None and key not in self.__bloom:
+            return False
+        if any(key in keys for keys in self.__pending.values()):
+            return True
+        return self.__connection.execute('SELECT 1 FROM records WHERE key = ?', (key,)).fetchone() is not None
+
+    def add(self, key: str, owner: Hashable = None) -> bool:
+        """Adds key to index
+
+        Parameters:
+            key: key of record (returned by 'get_key' method)
+            owner: harvest which adds key, keys of every owner are committed and rolled back separately
+
+        Return:
+            True if key is new, False if it is already in index
+        """
+        with self.__lock:
+            if self.__contains(key):
+                return False
+            self.__pending.setdefault(owner, set()).add(key)
+            if self.__bloom is not None:
+                self.__bloom.add(key)
+            return True
+
+    def commit(self, owner: Hashable = None):
+        """Saves keys added by owner
+
+        Parameters:
+            owner: harvest which added keys
+        """
+        with self.__lock, self.__connection:
+            self.__connection.executemany('INSERT OR IGNORE INTO records (key) VALUES (?)',
+                                          ((key,) for key in self.__pending.pop(owner, ())))
+
+    def rollback(self, owner: Hashable = None):
+        """Forgets keys added by owner after its last commit (Bloom filter can still answer 'possibly added' for them)
+
+        Parameters:
+            owner: harvest which added keys
+        """
+        with self.__lock:
+            self.__pending.pop(owner, None)
+
+    def close(self):
+        """Commits keys of all owners and closes the index"""
+        with self.__lock, self.__connection:
+            for keys in self.__pending.values():
+                self.__connection.executemany('INSERT OR IGNORE INTO records (key) VALUES (?)',
+                                              ((key,) for key in keys))
+            self.__pending.clear()
+        with self.__lock:
+            self.__connection.close()
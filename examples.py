@@ -3,6 +3,7 @@ import datetime
 
 from settings import disciplines
 from springer_search import SpringerSearch
+from scheduler import HarvestScheduler, HarvestJob
 
 if __name__ == '__main__':
     """EXAMPLES:
@@ -22,13 +23,14 @@ if __name__ == '__main__':
     """3) Save summary info about records(articles etc.) to file (20 records limit to be found)"""
     # spr.get_all_records('subject:"Medicine & Public Health"', 20)
 
-    """4) Collect all possible records by all disciplines
-     in the specified time interval with saving to files"""
-    for disc in disciplines:
-        qry = spr.create_query(subject=disc,
-                               onlinedatefrom='2000-01-01',
-                               onlinedateto='2022-05-01')
-        spr.get_all_records(qry, total=500)
+    """4) Collect all possible records by all disciplines concurrently
+     in the specified time interval with saving to files (interrupted harvests are resumed,
+     completed harvests are repeated only by jobs with resume=False)"""
+    jobs = [HarvestJob(spr.create_query(subject=disc,
+                                        onlinedatefrom='2000-01-01',
+                                        onlinedateto='2022-05-01'), total=500)
+            for disc in disciplines]
+    HarvestScheduler().run(jobs)
 
     """5) Create dataframe with count of publications by countries from 2019 year for 'Engineering' discipline"""
     # df = spr.collect_statistic_by_years('Engineering', category='country', from_=2019)
@@ -41,4 +43,11 @@ if __name__ == '__main__':
     #                       onlinedateto='2022-02-01')
     # df_2 = spr.create_dataframe_by_category('subject', qr)
 
+    """7) Collect records straight into DataFrame (without saving them to file)"""
+    # df = spr.create_dataframe_by_records('subject:"Physics" year:"2021"', total=1000)
+    # print(df.explode('keywords')['keywords'].value_counts())
+
+    """8) Weekly refresh: collect only records which appeared online since the previous run"""
+    # spr.sync_records(spr.create_query(subject='Physics', onlinedatefrom='2020-01-01'))
+
     print(str(datetime.timedelta(seconds=round(time.time() - start))))
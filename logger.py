@@ -1,13 +1,68 @@
 """
     Imports:
         os: used for interact with file system
+        queue: used for passing messages to background thread
+        atexit: used for writing buffered messages at exit
         logging: basic lib for work with logging
+        threading: used for attaching handlers only once
         settings from base_class: stores used consts for class Logger
 """
 import os
+import queue
+import atexit
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
 from typing import Union
-from settings import LOG_FOLDER, LOG_LVL, SH_LVL, FH_LVL
+from settings import LOG_FOLDER, LOG_LVL, SH_LVL, FH_LVL, LOG_PRINT, LOG_BATCH, LOG_FLUSH_INTERVAL
+
+#  level of message by its name or number: (level, whether to add traceback)
+LEVELS = {key: (lvl, name == 'EXCEPTION')
+          for number, (name, lvl) in enumerate([('DEBUG', logging.DEBUG), ('INFO', logging.INFO),
+                                                ('WARNING', logging.WARNING), ('ERROR', logging.ERROR),
+                                                ('CRITICAL', logging.CRITICAL), ('EXCEPTION', logging.ERROR)], 1)
+          for key in (name, number, str(number))}
+
+#  handlers of every logger: name of logger -> (listener, file handler, stream handler)
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+class BatchListener(QueueListener):
+    """Background thread passing messages from queue to handlers,
+    flushes buffered messages when queue is empty for 'interval' seconds"""
+
+    def __init__(self, messages: queue.Queue, *handlers, interval: float = LOG_FLUSH_INTERVAL):
+        super().__init__(messages, *handlers, respect_handler_level=True)
+        self.interval = interval
+
+    def dequeue(self, block: bool):
+        if not block:
+            return self.queue.get(False)
+        while True:
+            try:
+                return self.queue.get(True, self.interval)
+            except queue.Empty:
+                _flush(self.handlers)
+
+
+def _flush(handlers):
+    """Flushes handlers (stream can be already closed, e.g. replaced stderr of test runner)"""
+    for handler in handlers:
+        try:
+            handler.flush()
+        except (OSError, ValueError):
+            pass
+
+
+@atexit.register
+def _stop_listeners():
+    """Writes all queued and buffered messages"""
+    with _handlers_lock:
+        for listener, _, _ in _handlers.values():
+            if listener._thread is not None:
+                listener.stop()
+            _flush(listener.handlers)
 
 
 class Logger:
@@ -64,33 +119,41 @@ class Logger:
         self.__prefix = prefix
 
     def create_logger(self):
-        """Creates logger for parser. Takes the folder name or path to the folder to store
+        """Creates logger for parser. Handlers are attached only once for every prefix,
+        messages are written to file by background thread in batches
         """
-
-        # creating full path of log-file (path+file_name)
-        os.makedirs(LOG_FOLDER, exist_ok=True)
-        file = f'{self.prefix}.log'
-        full_name = os.path.join(LOG_FOLDER, file)
-
+        name = f'{self.prefix}_logger'
         # creating new logger
-        self._logger = logging.getLogger(f'{self.prefix}_logger')
+        self._logger = logging.getLogger(name)
         # set the logger level, messages which are less severe than level will be ignored
         self._logger.setLevel(LOG_LVL)
-        #  file handler
-        self._filehandler = logging.FileHandler(full_name, 'a')
-        self._filehandler.setLevel(FH_LVL)
-        #  stream handler
-        self._streamhandler = logging.StreamHandler()
-        self._streamhandler.setLevel(SH_LVL)
+        with _handlers_lock:
+            if name not in _handlers:
+                # creating full path of log-file (path+file_name)
+                os.makedirs(LOG_FOLDER, exist_ok=True)
+                full_name = os.path.join(LOG_FOLDER, f'{self.prefix}.log')
+                #  file handler
+                filehandler = logging.FileHandler(full_name, 'a')
+                filehandler.setLevel(FH_LVL)
+                # set format of messages
+                filehandler.setFormatter(
+                    logging.Formatter('%(asctime)s: %(levelname)s: %(name)s: %(message)s',
+                                      "%Y-%m-%d %H:%M:%S"))
+                #  stream handler
+                streamhandler = logging.StreamHandler()
+                streamhandler.setLevel(SH_LVL)
+                #  messages are written to file in batches (errors - immediately)
+                batchhandler = MemoryHandler(LOG_BATCH, logging.ERROR, filehandler)
+                batchhandler.setLevel(FH_LVL)
+                # add handlers to logger: caller only puts message into queue
+                messages = queue.SimpleQueue()
+                listener = BatchListener(messages, batchhandler, streamhandler)
+                listener.start()
+                self._logger.addHandler(QueueHandler(messages))
+                _handlers[name] = (listener, filehandler, streamhandler)
+            _, self._filehandler, self._streamhandler = _handlers[name]
         # save path to handler in var
         self._path_to_handler = self._filehandler.baseFilename
-        # set format of messages
-        self._filehandler.setFormatter(
-            logging.Formatter('%(asctime)s: %(levelname)s: %(name)s: %(message)s',
-                              "%Y-%m-%d %H:%M:%S"))
-        # add handlers to logger
-        self._logger.addHandler(self._filehandler)
-        self._logger.addHandler(self._streamhandler)
 
     def add_log(self, text: str, level: Union[str, int] = 'DEBUG'):
         """Adds the message to the log-file by level (DEBUG-EXCEPTION):
@@ -102,24 +165,16 @@ class Logger:
         Raises:
             Exception: if log-level doesn't exist
         """
-        # TODO (uncomment / comment) to (print / don't print) ALL logs in console
-        print(f"[{self.prefix}] {text}")
         # converting to uppercase
         if isinstance(level, str):
             level = level.upper()
-        # for DEBUG level
-        if level in ['DEBUG', 1, '1']:
-            self._logger.debug(text)
-        elif level in ['INFO', 2, '2']:
-            self._logger.info(text)
-        elif level in ['WARNING', 3, '3']:
-            self._logger.warning(text)
-        elif level in ['ERROR', 4, '4']:
-            self._logger.error(text)
-        elif level in ['CRITICAL', 5, '5']:
-            self._logger.critical(text)
-        elif level in ['EXCEPTION', 6, '6']:
-            self._logger.exception(text)
         # for wrong level
-        else:
+        if level not in LEVELS:
             raise Exception(f"Level '{level}' for logger doesn't exist")
+        level, exc_info = LEVELS[level]
+        # print ALL logs in console (LOG_PRINT in settings)
+        if LOG_PRINT:
+            print(f"[{self.prefix}] {text}")
+        # messages of disabled levels are dropped without creating records
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, text, exc_info=exc_info)
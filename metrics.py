@@ -0,0 +1,242 @@
+"""
+    Imports:
+        os: used for interact with file system
+        json: used for exporting metrics in json format
+        time: used for measuring duration of phases
+        pstats: used for saving profile in text format
+        cProfile: used for profiling
+        threading: used for safe updating of metrics and periodic export
+        contextlib: used for creating context managers
+"""
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+from typing import Optional
+
+from settings import METRICS_INTERVAL
+
+#  upper bounds (seconds) of histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+
+class Metrics:
+    """Thread-safe counters and timers of harvest pipeline
+
+    Counters (increased with 'inc'):
+        requests, retries, errors, cache_hits, bytes_received,
+        records_received, records_kept, records_discarded, records_duplicated, records_written
+    Timers (measured with 'timer' or 'observe', seconds):
+        request (network), decode (JSON), parse (records of page or record), write (page or record),
+        fetch_wait (pipeline waits for fetched page), write_blocked (parsed page waits for writer)
+
+    Methods:
+        inc(name, value):
+            Increases counter
+        observe(name, seconds):
+            Adds measured duration to timer
+        timer(name):
+            Context manager measuring duration of block
+        snapshot():
+            Dictionary with current values
+        to_json() / to_prometheus():
+            Current values in json / Prometheus text format
+
+    Examples:
+        Where does harvest spend time:
+            spr.get_all_records(query)
+            spr.metrics.snapshot()['timers']
+    """
+
+    def __init__(self, prefix: str = 'springer'):
+        """Initialize method
+
+        Parameters:
+            prefix: prefix of metric names in Prometheus format
+        """
+        self.prefix = prefix
+        self.__lock = threading.Lock()
+        self.__started = time.time()
+        self.__counters = {}
+        #  name: [count, sum, max, counts by buckets]
+        self.__timers = {}
+
+    def inc(self, name: str, value: float = 1):
+        """Increases counter
+
+        Parameters:
+            name: name of counter
+            value: increment
+        """
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        """Adds measured duration to timer
+
+        Parameters:
+            name: name of timer
+            seconds: measured duration
+        """
+        with self.__lock:
+            timer = self.__timers.get(name)
+            if timer is None:
+                timer = self.__timers[name] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    timer[3][i] += 1
+                    break
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        """Measures duration of block
+
+        Parameters:
+            name: name of timer
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        """Removes all values"""
+        with self.__lock:
+            self.__started = time.time()
+            self.__counters.clear()
+            self.__timers.clear()
+
+    def snapshot(self) -> dict:
+        """Current values of counters and timers
+
+        Return:
+            dictionary with 'uptime', 'counters' and 'timers' keys
+            (timers have count, total, mean and max seconds)
+        """
+        with self.__lock:
+            return {
+                'uptime': time.time() - self.__started,
+                'counters': dict(self.__counters),
+                'timers': {name: {'count': count, 'total': total, 'mean': total / count if count else 0.0,
+                                  'max': maximum}
+                           for name, (count, total, maximum, _) in self.__timers.items()},
+            }
+
+    def to_json(self) -> str:
+        """Current values in json format"""
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self) -> str:
+        """Current values in Prometheus text format (counters and histograms of timers)"""
+        with self.__lock:
+            lines = []
+            for name, value in sorted(self.__counters.items()):
+                metric = f'{self.prefix}_{name}_total'
+                lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+            for name, (count, total, _, buckets) in sorted(self.__timers.items()):
+                metric = f'{self.prefix}_{name}_seconds'
+                lines.append(f'# TYPE {metric} histogram')
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS, buckets):
+                    cumulative += bucket
+                    le = '+Inf' if bound == float('inf') else bound
+                    lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+                lines += [f'{metric}_sum {total}', f'{metric}_count {count}']
+            return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """Periodically writes metrics to file (in background thread)
+
+    Examples:
+        Export for Prometheus node-exporter textfile collector:
+            with MetricsExporter(spr.metrics, 'metrics/springer.prom'):
+                spr.get_all_records(query)
+    """
+
+    def __init__(self, metrics: Metrics, filename: str, interval: float = METRICS_INTERVAL,
+                 fmt: Optional[str] = None):
+        """Initialize method
+
+        Parameters:
+            metrics: exported metrics
+            filename: file to write metrics
+            interval: seconds between exports
+            fmt: 'prometheus' or 'json' (None as default - by extension of file, '.json' for json)
+        """
+        self.__metrics = metrics
+        self.__filename = filename
+        self.__interval = interval
+        self.__fmt = fmt or ('json' if filename.endswith('.json') else 'prometheus')
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def export(self):
+        """Writes current metrics to file"""
+        content = self.__metrics.to_json() if self.__fmt == 'json' else self.__metrics.to_prometheus()
+        folder = os.path.dirname(self.__filename)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        #  readers never see a partial file
+        tmp_name = f'{self.__filename}.tmp'
+        with open(tmp_name, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_name, self.__filename)
+
+    def __run(self):
+        """Exports metrics until exporter is stopped"""
+        while not self.__stopped.wait(self.__interval):
+            self.export()
+
+    def start(self):
+        """Starts periodic export"""
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stops periodic export and writes final values"""
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+        self.export()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+@contextlib.contextmanager
+def profiled(filename: str, sort: str = 'cumulative'):
+    """Profiles block with cProfile (only current thread: parsers and writer of get_all_records run in
+    other threads, use SpringerSearch(parsers=0) to profile them, requests made by workers are measured by Metrics)
+
+    Parameters:
+        filename: file to save profile ('.prof' - binary profile for pstats/snakeviz, other - text report)
+        sort: sort key of text report
+
+    Examples:
+        with profiled('harvest.prof'):
+            SpringerSearch(parsers=0).get_all_records(query, total=1000)
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if filename.endswith('.prof'):
+            profiler.dump_stats(filename)
+        else:
+            with open(filename, 'w', encoding='utf-8') as file:
+                pstats.Stats(profiler, stream=file).sort_stats(sort).print_stats()
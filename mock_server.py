@@ -0,0 +1,288 @@
+"""
+    Local stand-in for Springer API (https://api.springernature.com/metadata/json)
+    with synthetic records and facets, used for benchmarks and offline development.
+
+    Imports:
+        re: used for parsing constraints of query
+        json: used for encoding responses
+        time: used for simulating latency
+        random: used for simulating errors
+        datetime: used for dates of synthetic records
+        threading: used for running server in background
+        argparse: used for running server from command line
+        http.server: used for serving requests
+        urllib.parse: used for parsing query-string
+"""
+import re
+import json
+import time
+import random
+import datetime
+import threading
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Optional
+
+from settings import disciplines, categories
+
+#  values for synthetic records and facets
+COUNTRIES = ['United States', 'China', 'Germany', 'United Kingdom', 'Japan', 'India', 'France', 'Italy',
+             'Canada', 'Spain', 'Australia', 'Russian Federation', 'Brazil', 'Netherlands', 'Switzerland']
+KEYWORDS = ['Machine learning', 'Deep learning', 'Optimization', 'Simulation', 'Climate change', 'Graphene',
+            'Neural networks', 'Statistics', 'Education', 'Public health', 'Cancer', 'Quantum computing',
+            'Game theory', 'Sustainability', 'Genomics', 'Robotics', 'Blockchain', 'COVID-19', 'Ethics', 'Finance']
+TYPES = ['Article', 'Chapter', 'Book', 'ConferencePaper']
+WORDS = ['data', 'model', 'method', 'analysis', 'results', 'system', 'study', 'approach', 'network', 'time']
+
+
+class MockSpringerAPI:
+    """Local HTTP server imitating Springer metadata API
+
+    Records are numbered from 1 to 'total', online dates of records are evenly distributed
+    between 'date_from' and 'date_to', so 'onlinedatefrom'/'onlinedateto' and 'year' constraints
+    select a range of records. Other constraints don't change the result.
+
+    Methods:
+        start():
+            Starts server in background thread
+        stop():
+            Stops server
+        url:
+            URL to be used as 'api_url' of SpringerSearch
+        stats:
+            Number of requests, errors and sent bytes
+
+    Examples:
+        with MockSpringerAPI(total=5000, latency=0.05) as api:
+            spr = SpringerSearch(api_url=api.url, token='test')
+            spr.get_all_records('subject:"Physics"')
+    """
+
+    def __init__(self, total: int = 20000, latency: float = 0.0, error_rate: float = 0.0,
+                 max_page_size: int = 100, max_depth: int = 10000, abstract_words: int = 150,
+                 date_from: str = '2000-01-01', date_to: str = '2022-12-31',
+                 host: str = '127.0.0.1', port: int = 0):
+        """Initialize method
+
+        Parameters:
+            total: number of records by query without date constraints
+            latency: delay (in seconds) before every response
+            error_rate: probability of 429/500/503 response
+            max_page_size: max number of records in 1 response (bigger 'p' is reduced)
+            max_depth: max offset of record ('s' param), deeper requests return 400 status
+            abstract_words: number of words in abstract of record
+            date_from: online date of the first record
+            date_to: online date of the last record
+            host: host of server
+            port: port of server (0 - any free port)
+        """
+        self.total = total
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_page_size = max_page_size
+        self.max_depth = max_depth
+        self.abstract_words = abstract_words
+        self.date_from = datetime.date.fromisoformat(date_from)
+        self.date_to = datetime.date.fromisoformat(date_to)
+        self.requests = self.errors = self.sent_bytes = 0
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer((host, port), self.__handler())
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        """URL of API"""
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}/metadata/json'
+
+    @property
+    def stats(self) -> dict:
+        """Number of requests, errors and sent bytes"""
+        return {'requests': self.requests, 'errors': self.errors, 'sent_bytes': self.sent_bytes}
+
+    def start(self):
+        """Starts server in background thread"""
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stops server"""
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __date(self, number: int) -> datetime.date:
+        """Online date of record by its number"""
+        days = (self.date_to - self.date_from).days
+        return self.date_from + datetime.timedelta(days=(number - 1) * days // max(1, self.total - 1))
+
+    def __first_after(self, date: datetime.date) -> int:
+        """Number of the first record with online date later than date (total + 1 if there is no such record)"""
+        low, high = 1, self.total + 1
+        while low < high:
+            middle = (low + high) // 2
+            if self.__date(middle) > date:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def __range(self, query: str) -> tuple:
+        """Numbers of the first and the last records selected by query"""
+        first, last = 1, self.total
+        constraints = dict(re.findall(r'(\w+):"([^"]*)"', query))
+        if 'year' in constraints:
+            year = int(constraints['year'])
+            first = max(first, self.__first_after(datetime.date(year - 1, 12, 31)))
+            last = min(last, self.__first_after(datetime.date(year, 12, 31)) - 1)
+        if 'onlinedatefrom' in constraints:
+            date = datetime.date.fromisoformat(constraints['onlinedatefrom'])
+            first = max(first, self.__first_after(date - datetime.timedelta(days=1)))
+        if 'onlinedateto' in constraints:
+            last = min(last, self.__first_after(datetime.date.fromisoformat(constraints['onlinedateto'])) - 1)
+        return first, last
+
+    def __record(self, number: int) -> dict:
+        """Synthetic record by its number"""
+        date = self.__date(number).isoformat()
+        rnd = random.Random(number)
+        record = {
+            'contentType': TYPES[number % len(TYPES)],
+            'identifier': f'doi:10.0000/mock.{number}',
+            'language': 'en',
+            'url': [{'format': '', 'platform': '', 'value': f'http://dx.doi.org/10.0000/mock.{number}'}],
+            'title': f'Synthetic {rnd.choice(WORDS)} of {rnd.choice(KEYWORDS).lower()} number {number}',
+            'creators': [{'creator': f'Author{rnd.randint(1, 5000)}, A.'} for _ in range(rnd.randint(1, 6))],
+            'publicationName': f'Journal of {rnd.choice(KEYWORDS)}',
+            'doi': f'10.0000/mock.{number}',
+            'publisher': 'Springer',
+            'publicationDate': date,
+            'onlineDate': date,
+            'abstract': ' '.join(rnd.choice(WORDS) for _ in range(self.abstract_words)),
+        }
+        #  not all records have keywords
+        if number % 5:
+            record['keyword'] = rnd.sample(KEYWORDS, rnd.randint(1, 5))
+        return record
+
+    def __facets(self, query: str, count: int) -> list:
+        """Synthetic facets for query with 'count' records"""
+        rnd = random.Random(query)
+        values = {'subject': disciplines, 'keyword': KEYWORDS, 'pub': [f'Journal of {k}' for k in KEYWORDS],
+                  'year': [str(year) for year in range(self.date_to.year, self.date_from.year - 1, -1)],
+                  'country': COUNTRIES, 'type': TYPES}
+        facets = []
+        for name in sorted(categories, key=categories.get):
+            facet = []
+            for value in values[name][:20]:
+                facet.append({'value': value, 'count': str(int(count * rnd.random()))})
+            facet.sort(key=lambda item: -int(item['count']))
+            facets.append({'name': name, 'values': facet})
+        return facets
+
+    def response(self, query: str, start: int, size: int) -> tuple:
+        """Status and body of response for request
+
+        Parameters:
+            query: query-string ('q' param)
+            start: number of the first record ('s' param)
+            size: number of records ('p' param)
+        """
+        if start > self.max_depth:
+            return 400, {'error': {'error': 'Bad Request',
+                                   'error_description': f'Start index must be <= {self.max_depth}'}}
+        size = min(size, self.max_page_size)
+        first, last = self.__range(query)
+        count = max(0, last - first + 1)
+        numbers = range(first + start - 1, min(first + start - 1 + size, last + 1))
+        return 200, {
+            'apiMessage': 'This JSON was provided by mock Springer Nature Metadata API',
+            'query': query,
+            'result': [{'total': str(count), 'start': str(start), 'pageLength': str(size),
+                        'recordsDisplayed': str(len(numbers))}],
+            'records': [self.__record(number) for number in numbers],
+            'facets': self.__facets(query, count),
+        }
+
+    def handle(self, path: str) -> tuple:
+        """Handles request (with simulated latency and errors)
+
+        Parameters:
+            path: path of request with query-string
+
+        Return:
+            status, headers and content of response
+        """
+        params = parse_qs(urlparse(path).query)
+        if self.latency:
+            time.sleep(self.latency)
+        headers = {}
+        if self.error_rate and random.random() < self.error_rate:
+            status = random.choice([429, 500, 503])
+            body = {'error': 'Simulated error'}
+            if status == 429:
+                headers['Retry-After'] = '0'
+        else:
+            status, body = self.response(params.get('q', [''])[0], int(params.get('s', ['1'])[0]),
+                                         int(params.get('p', ['10'])[0]))
+        content = json.dumps(body).encode('utf-8')
+        with self.__lock:
+            self.requests += 1
+            self.errors += status != 200
+            self.sent_bytes += len(content)
+        return status, headers, content
+
+    def __handler(self):
+        """Class of request handler bound to this server"""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                status, headers, content = api.handle(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+        return Handler
+
+
+def main(args: Optional[list] = None):
+    """Runs mock server from command line"""
+    parser = argparse.ArgumentParser(description='Local mock of Springer metadata API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--total', type=int, default=20000, help='number of records')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of response in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of error response')
+    parser.add_argument('--max-depth', type=int, default=10000, help='max offset of record')
+    options = parser.parse_args(args)
+    api = MockSpringerAPI(total=options.total, latency=options.latency, error_rate=options.error_rate,
+                          max_depth=options.max_depth, host=options.host, port=options.port)
+    print(f'Mock Springer API is running at {api.url}')
+    try:
+        api.start()
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == '__main__':
+    main()
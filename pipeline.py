@@ -0,0 +1,242 @@
+"""
+    Imports:
+        time: used for measuring throughput of stages
+        queue: used for bounded queue of parsed pages
+        threading: used for running writer and stopping pipeline
+        collections: used for keeping order of pages being parsed
+        concurrent.futures: used for pools of parsers
+"""
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Callable, Iterable, Iterator, Sized
+
+from settings import PARSERS, PARSE_PROCESSES, PIPELINE_QUEUE
+from records import parse_record
+from dedup import DedupIndex
+from metrics import Metrics
+
+#  stages of pipeline and their timers in metrics
+STAGES = {'fetch': 'fetch_wait', 'parse': 'parse', 'write': 'write'}
+
+
+def parse_page(page: tuple) -> tuple:
+    """Parses records of fetched page (module-level to be run in process pool)
+
+    Parameters:
+        page: (sub-query, offset of the next page, list or iterator of records)
+
+    Return:
+        (sub-query, offset of the next page, errors of parsing, list of (key, online date, Record or None))
+    """
+    part, next_offset, records = page
+    rows, errors = [], []
+    for record in records:
+        try:
+            row = parse_record(record)
+        except Exception as err:
+            row = None
+            errors.append(str(err))
+        rows.append((DedupIndex.get_key(record), record.get('onlineDate'), row))
+    return part, next_offset, errors, rows
+
+
+def _timed(function: Callable, page: tuple) -> tuple:
+    """Result of function and its duration in seconds (measured in parser thread or process)"""
+    start = time.perf_counter()
+    return function(page), time.perf_counter() - start
+
+
+class Pipeline:
+    """Pipeline of harvest: fetched pages -> pool of parsers -> single writer
+
+    Stages are connected by bounded queues: at most 2 pages per parser are parsed at once and at most
+    'queue_size' parsed pages wait for the writer, so when sink is slow, parsers and then fetchers wait
+    (backpressure) and memory stays capped. Pages are written in order of source.
+    Parsers are threads or processes (for CPU-heavy parsing), the parse function of processes must be
+    module-level (e.g. parse_page). With 0 parsers pages are parsed and written by the current thread.
+
+    Pages are tuples with list of records as the last item (the same for parsed pages),
+    with 0 parsers records of page can be an iterator (e.g. streamed page), it is consumed by parse function.
+    Throughput of every stage is counted: records per second of its work (for fetch stage -
+    of waiting for fetched pages), so the slowest stage is the bottleneck of harvest.
+
+    Methods:
+        run(pages):
+            Runs pages through stages until write function returns False
+        stats():
+            Pages, records, seconds and throughput of stages
+        report():
+            Throughput of stages as text
+
+    Examples:
+        pipeline = Pipeline(parse_page, save_page, parsers=4, processes=True)
+        pipeline.run(pages)
+        print(pipeline.report())
+    """
+
+    def __init__(self, parse: Callable[[tuple], tuple], write: Callable[[tuple], Optional[bool]],
+                 parsers: int = PARSERS, processes: bool = PARSE_PROCESSES, queue_size: int = PIPELINE_QUEUE,
+                 metrics: Optional[Metrics] = None):
+        """Initialize method
+
+        Parameters:
+            parse: function parsing fetched page
+            write: function saving parsed page (returns False to stop pipeline)
+            parsers: number of parsers (0 - pages are parsed and written by the current thread)
+            processes: parse pages in processes instead of threads (False as default)
+            queue_size: max number of parsed pages waiting for the writer
+            metrics: metrics updated with durations of stages (timers 'fetch_wait', 'parse', 'write',
+                'write_blocked')
+        """
+        self.parse = parse
+        self.write = write
+        self.parsers = max(0, parsers)
+        self.processes = processes
+        self.queue_size = max(1, queue_size)
+        self.metrics = metrics
+        self.__lock = threading.Lock()
+        self.__stats = {stage: {'pages': 0, 'records': 0, 'seconds': 0.0} for stage in STAGES}
+        #  seconds of waiting of parsed pages for room in queue
+        self.__blocked = 0.0
+        self.__elapsed = 0.0
+
+    def run(self, pages: Iterable[tuple]):
+        """Runs pages through stages until pages end or write function returns False
+
+        Parameters:
+            pages: fetched pages
+
+        Raises:
+            any exception of source of pages, parse function or write function
+        """
+        start = time.perf_counter()
+        try:
+            if self.parsers:
+                self.__run_concurrently(self.__fetch(pages))
+            else:
+                for page in self.__fetch(pages):
+                    parsed = self.__count('parse', *_timed(self.parse, page))
+                    if not isinstance(page[-1], Sized):
+                        #  records of iterator are counted when they are parsed
+                        self.__count('fetch', parsed, 0.0, pages=0)
+                    if not self.__write(parsed):
+                        break
+        finally:
+            self.__elapsed += time.perf_counter() - start
+
+    def __run_concurrently(self, pages: Iterator[tuple]):
+        """Runs parsers in pool and writer in separate thread"""
+        parsed = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        writer = threading.Thread(target=self.__writer, args=(parsed, stop, errors), name='pipeline-writer',
+                                  daemon=True)
+        writer.start()
+        executor_class = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+        try:
+            with executor_class(max_workers=self.parsers) as executor:
+                #  pages being parsed in order of source
+                window = deque()
+                try:
+                    for page in pages:
+                        if stop.is_set():
+                            break
+                        window.append(executor.submit(_timed, self.parse, page))
+                        while window and (len(window) >= 2 * self.parsers or window[0].done()):
+                            self.__put(parsed, window.popleft())
+                    while window and not stop.is_set():
+                        self.__put(parsed, window.popleft())
+                finally:
+                    for future in window:
+                        future.cancel()
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            #  writer skips the rest of pages after stop and finishes on None
+            parsed.put(None)
+            writer.join()
+        if errors:
+            raise errors[0]
+
+    def __fetch(self, pages: Iterable[tuple]) -> Iterator[tuple]:
+        """Pages of source with measuring of waiting for them"""
+        pages = iter(pages)
+        while True:
+            start = time.perf_counter()
+            page = next(pages, None)
+            if page is None:
+                return
+            yield self.__count('fetch', page, time.perf_counter() - start,
+                               records=len(page[-1]) if isinstance(page[-1], Sized) else 0)
+
+    def __put(self, parsed: queue.Queue, future):
+        """Puts parsed page to queue of writer (waits while queue is full)"""
+        page = self.__count('parse', *future.result())
+        start = time.perf_counter()
+        parsed.put(page)
+        blocked = time.perf_counter() - start
+        with self.__lock:
+            self.__blocked += blocked
+        if self.metrics is not None:
+            self.metrics.observe('write_blocked', blocked)
+
+    def __writer(self, parsed: queue.Queue, stop: threading.Event, errors: list):
+        """Writes parsed pages one by one (runs in separate thread)"""
+        while True:
+            page = parsed.get()
+            if page is None:
+                return
+            if stop.is_set():
+                continue
+            try:
+                if not self.__write(page):
+                    stop.set()
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+
+    def __write(self, page: tuple) -> bool:
+        """Writes parsed page, returns False to stop pipeline"""
+        start = time.perf_counter()
+        more = self.write(page)
+        self.__count('write', page, time.perf_counter() - start)
+        return more is not False
+
+    def __count(self, stage: str, page: tuple, seconds: float, pages: int = 1, records: Optional[int] = None) -> tuple:
+        """Adds page processed by stage to statistics and returns page"""
+        with self.__lock:
+            stats = self.__stats[stage]
+            stats['pages'] += pages
+            stats['records'] += len(page[-1]) if records is None else records
+            stats['seconds'] += seconds
+        if self.metrics is not None and pages:
+            self.metrics.observe(STAGES[stage], seconds)
+        return page
+
+    def stats(self) -> dict:
+        """Pages, records, seconds of work and throughput (records per second) of stages
+
+        Return:
+            dictionary with stages ('fetch', 'parse', 'write'), 'blocked' (seconds of waiting of
+            parsed pages for the writer) and 'elapsed' (seconds of pipeline) keys
+        """
+        with self.__lock:
+            stats = {stage: dict(values, records_per_sec=values['records'] / values['seconds']
+                                 if values['seconds'] else None)
+                     for stage, values in self.__stats.items()}
+            stats.update(blocked=self.__blocked, elapsed=self.__elapsed)
+        return stats
+
+    def report(self) -> str:
+        """Throughput of stages as text"""
+        stats = self.stats()
+        stages = ', '.join(f"{stage} {stats[stage]['records']} records in {stats[stage]['seconds']:.2f} s"
+                           + (f" ({stats[stage]['records_per_sec']:.0f} records/s)"
+                              if stats[stage]['records_per_sec'] else '')
+                           for stage in STAGES)
+        return f"Pipeline: {stages}; parsed pages waited {stats['blocked']:.2f} s for writer, " \
+               f"total {stats['elapsed']:.2f} s"
@@ -0,0 +1,131 @@
+"""
+    Imports:
+        os: used for interact with file system
+        json: used for storing number of requests per day
+        time: used for waiting for free tokens
+        datetime: used for resetting daily counter
+        threading: used for sharing limiter between several threads
+"""
+import os
+import json
+import time
+import datetime
+import threading
+from typing import Optional
+
+from settings import folder, RATE_LIMIT, RATE_BURST, DAILY_LIMIT
+
+
+class QuotaExceeded(Exception):
+    """Daily limit of requests is reached"""
+
+
+class RateLimiter:
+    """Token bucket limiting requests to Springer API (requests per second and requests per day)
+
+    Every request (from any thread) must take a token with 'acquire' method.
+    Number of requests made today is saved to '<folder>/quota.json' and updated by every request,
+    so the daily limit is shared by all limiters and runs during the day.
+    Instances created without own limiter share the default limiter of process (see 'default' method).
+
+    Methods:
+        default():
+            Returns limiter shared by the whole process
+        acquire():
+            Waits for a free token and counts request
+        pause(seconds):
+            Stops giving tokens for specified time (e.g. after 429 response)
+        used_today:
+            Number of requests made today
+    """
+    #  counter of requests in file is updated by all limiters of process
+    _lock = threading.Lock()
+    _default = None
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: int = RATE_BURST, daily_limit: Optional[int] = DAILY_LIMIT,
+                 path: str = os.path.join(folder, 'quota.json')):
+        """Initialize method
+
+        Parameters:
+            rate: number of requests per second
+            burst: max number of requests made at once
+            daily_limit: max number of requests per day (None - unlimited)
+            path: file to save number of requests made today
+        """
+        self.__rate = rate
+        self.__burst = max(1, burst)
+        self.__daily_limit = daily_limit
+        self.__path = path
+        self.__lock = threading.Lock()
+        #  tokens in bucket
+        self.__tokens = float(self.__burst)
+        self.__updated = time.monotonic()
+        #  time until tokens aren't given
+        self.__paused_until = 0.0
+
+    @classmethod
+    def default(cls) -> 'RateLimiter':
+        """Returns limiter with limits from settings shared by the whole process"""
+        with cls._lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __load(self) -> int:
+        """Loads number of requests made today"""
+        try:
+            with open(self.__path, encoding='utf-8') as file:
+                quota = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        return quota.get('used', 0) if quota.get('day') == datetime.date.today().isoformat() else 0
+
+    def __count(self):
+        """Counts request in file (re-read, so requests of other limiters and runs are not overwritten)
+
+        Raises:
+            QuotaExceeded: if daily limit is reached
+        """
+        with self._lock:
+            used = self.__load()
+            if self.__daily_limit is not None and used >= self.__daily_limit:
+                raise QuotaExceeded(f"Daily limit of {self.__daily_limit} requests is reached")
+            if os.path.dirname(self.__path):
+                os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+            tmp_name = f'{self.__path}.{os.getpid()}.tmp'
+            with open(tmp_name, 'w', encoding='utf-8') as file:
+                json.dump({'day': datetime.date.today().isoformat(), 'used': used + 1}, file)
+            os.replace(tmp_name, self.__path)
+
+    @property
+    def used_today(self) -> int:
+        """Number of requests made today"""
+        return self.__load()
+
+    def pause(self, seconds: float):
+        """Stops giving tokens for specified time
+
+        Parameters:
+            seconds: time to pause
+        """
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """Waits for a free token and counts request
+
+        Raises:
+            QuotaExceeded: if daily limit is reached
+        """
+        while True:
+            with self.__lock:
+                current = time.monotonic()
+                self.__tokens = min(self.__burst, self.__tokens + (current - self.__updated) * self.__rate)
+                self.__updated = current
+                if current >= self.__paused_until and self.__tokens >= 1:
+                    self.__count()
+                    self.__tokens -= 1
+                    return
+                #  time until the next token
+                wait = max(self.__paused_until - current, (1 - self.__tokens) / self.__rate)
+            time.sleep(wait)
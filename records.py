@@ -0,0 +1,159 @@
+"""
+    Imports:
+        pandas: used for creating data frames from batches of records (imported on first use)
+"""
+from typing import TYPE_CHECKING, NamedTuple, Optional, List, Iterable, Iterator
+
+from settings import POOL_SIZE
+from writers import HEADER
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+#  columns of data frame stored as categories (few distinct values)
+CATEGORICAL = ('type', 'language', 'source/applicant')
+
+
+class Record(NamedTuple):
+    """Summary information about record (the same order as columns of saved files)"""
+    type: Optional[str]
+    language: Optional[str]
+    url: Optional[str]
+    title: Optional[str]
+    creators: Optional[List[str]]
+    source: Optional[str]
+    publication_date: Optional[str]
+    abstract: Optional[str]
+    keywords: Optional[List[str]]
+
+
+class StringPool:
+    """Pool of repeated strings (keywords, journals, types, languages), equal values share one object
+
+    Pool stops growing when it reaches 'max_size' strings (new values are returned as is).
+    Values may be added from several threads: a race only leaves two copies of a string.
+
+    Examples:
+        pool = StringPool()
+        keywords = [pool(keyword) for keyword in record['keyword']]
+    """
+
+    def __init__(self, max_size: int = POOL_SIZE):
+        """Initialize method
+
+        Parameters:
+            max_size: max number of strings in pool
+        """
+        self.__max_size = max_size
+        self.__strings = {}
+
+    def __len__(self) -> int:
+        return len(self.__strings)
+
+    def __call__(self, value: Optional[str]) -> Optional[str]:
+        """Returns pooled string equal to value"""
+        if value is None:
+            return None
+        pooled = self.__strings.get(value)
+        if pooled is None:
+            if len(self.__strings) >= self.__max_size:
+                return value
+            pooled = self.__strings.setdefault(value, value)
+        return pooled
+
+
+class RecordBatch:
+    """Columnar batch of records: values of every field are kept in separate lists,
+    so there is no tuple per record and data frame is built from columns directly
+
+    Methods:
+        append(record):
+            Adds record to batch
+        extend(records):
+            Adds several records to batch
+        to_dataframe(categorical):
+            Creates data frame with the same columns as saved files
+
+    Examples:
+        batch = RecordBatch(spr.iter_records(query, total=10000))
+        df = batch.to_dataframe()
+    """
+
+    def __init__(self, records: Iterable[Record] = ()):
+        """Initialize method
+
+        Parameters:
+            records: initial records
+        """
+        self.__columns = tuple([] for _ in Record._fields)
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return len(self.__columns[0])
+
+    def __iter__(self) -> Iterator[Record]:
+        return map(Record._make, zip(*self.__columns))
+
+    def append(self, record: Record):
+        """Adds record to batch"""
+        for column, value in zip(self.__columns, record):
+            column.append(value)
+
+    def extend(self, records: Iterable[Record]):
+        """Adds several records to batch"""
+        for record in records:
+            self.append(record)
+
+    def to_dataframe(self, categorical: bool = True) -> 'pd.DataFrame':
+        """Creates data frame with the same columns as saved files
+
+        Parameters:
+            categorical: store type, language and source of records as categories (True as default)
+        """
+        import pandas as pd
+
+        dataframe = pd.DataFrame(dict(zip(HEADER, self.__columns)), columns=HEADER)
+        if categorical:
+            dataframe = dataframe.astype({name: 'category' for name in CATEGORICAL})
+        return dataframe
+
+
+#  repeated strings of parsed records (fields with few distinct values, mostly unique creators aren't pooled)
+strings = StringPool()
+
+
+def parse_record(record: dict, pool: StringPool = strings) -> Record:
+    """Get the main info about record (module-level to be run in process pool)
+
+    Parameters:
+        record: dictionary with all info about record
+        pool: pool of repeated strings (every process has its own pool)
+
+    Return:
+        record with summary information
+    """
+    return Record(pool(record.get('contentType')),
+                  pool(record.get('language')),
+                  record.get('url')[0]['value'] if record.get('url') else None,
+                  record.get('title'),
+                  _creators(record),
+                  pool(record.get('publicationName')),
+                  record.get('publicationDate'),
+                  record.get('abstract'),
+                  _keywords(record, pool))
+
+
+def _keywords(record: dict, pool: StringPool) -> Optional[List[str]]:
+    """Keywords of record in correct format"""
+    if all(key not in record for key in ('keyword', 'keywords')):
+        return None
+    key = 'keywords' if 'keywords' in record else 'keyword'
+    return [pool(keyword) for keyword in record[key] if '  ' not in keyword]
+
+
+def _creators(record: dict) -> Optional[List[str]]:
+    """Names of creators of record"""
+    creators = record.get('creators')
+    if isinstance(creators, list):
+        return [creator['creator'] if isinstance(creator, dict) else creator for creator in creators]
+    return None
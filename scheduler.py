@@ -0,0 +1,143 @@
+"""
+    Imports:
+        time: used for measuring duration of jobs
+        threading: used for creating one SpringerSearch instance per worker
+        concurrent.futures: used for running jobs concurrently
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import NamedTuple, Optional, List, Iterable
+
+from settings import WORKERS, JOB_WORKERS, API_URL
+from logger import Logger
+from cache import ResponseCache
+from ratelimit import RateLimiter
+from dedup import DedupIndex
+from metrics import Metrics
+from springer_search import SpringerSearch, create_session
+
+
+class HarvestJob(NamedTuple):
+    """Job for HarvestScheduler: parameters of get_all_records method and priority of job
+
+    Examples:
+        HarvestJob('subject:"Physics" year:"2021"', total=1000, sink='parquet', priority=1)
+
+        Harvest again by query of completed job:
+            HarvestJob('subject:"Physics" year:"2021"', total=1000, resume=False)
+    """
+    query: str
+    total: Optional[int] = None
+    sink: str = 'csv'
+    #  jobs with higher priority are started first
+    priority: int = 0
+    dedup: bool = False
+    #  continue interrupted harvest from checkpoint (completed harvest isn't run again)
+    resume: bool = True
+
+
+class HarvestScheduler(Logger):
+    """Runs several harvests (get_all_records) concurrently on a pool of workers
+
+    All workers share one connection pool, one cache of responses, one index of saved records
+    and one rate limiter, so the limits of API key are respected by all jobs together.
+    Jobs are resumed from checkpoints, so failed jobs can be completed by running them again
+    (completed jobs are run again only with 'resume' set to False).
+
+    Methods:
+        run(jobs):
+            Runs jobs and returns their results
+        metrics:
+            Counters and timers of all jobs together
+
+    Examples:
+        Collect records by all disciplines:
+            jobs = [HarvestJob(f'subject:"{disc}"', total=500) for disc in disciplines]
+            results = HarvestScheduler().run(jobs)
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, page_workers: int = WORKERS,
+                 rate_limiter: Optional[RateLimiter] = None, prefix: str = 'Scheduler',
+                 api_url: str = API_URL, token: Optional[str] = None):
+        """Initialize method
+
+        Parameters:
+            workers: number of jobs running concurrently
+            page_workers: number of pages requested concurrently by every job
+            rate_limiter: limiter of requests
+                (None as default - limiter with limits from settings shared by the process)
+            prefix: name of the logger
+            api_url: URL of Springer API (can be replaced with URL of mock server)
+            token: API key (None as default - 'TOKEN' from 'api_token.py' file)
+        """
+        super().__init__(prefix)
+        self.__workers = max(1, workers)
+        self.__page_workers = max(1, page_workers)
+        #  resources shared by all workers
+        self.__session = create_session(self.__workers * self.__page_workers)
+        self.__rate_limiter = rate_limiter or RateLimiter.default()
+        self.__cache = ResponseCache()
+        self.__dedup_index = None
+        self.metrics = Metrics()
+        self.__api_url = api_url
+        self.__token = token
+        #  SpringerSearch instance of every worker
+        self.__local = threading.local()
+
+    def __searcher(self) -> SpringerSearch:
+        """SpringerSearch instance of current worker"""
+        if not hasattr(self.__local, 'searcher'):
+            self.__local.searcher = SpringerSearch(self.prefix, self.__page_workers,
+                                                   dedup_index=self.__dedup_index,
+                                                   rate_limiter=self.__rate_limiter,
+                                                   session=self.__session, cache=self.__cache,
+                                                   api_url=self.__api_url, token=self.__token,
+                                                   metrics=self.metrics)
+        return self.__local.searcher
+
+    def __run_job(self, job: HarvestJob) -> dict:
+        """Runs one job
+
+        Return:
+            dictionary with result of job
+        """
+        start = time.monotonic()
+        self.add_log(f"Job '{job.query}' started", 'INFO')
+        try:
+            saved = self.__searcher().get_all_records(job.query, job.total, job.sink, job.resume, job.dedup)
+        except Exception as exc:
+            self.add_log(f"Job '{job.query}' failed: {exc}", 'ERROR')
+            return {'query': job.query, 'status': 'failed', 'saved': None,
+                    'seconds': time.monotonic() - start, 'error': str(exc)}
+        return {'query': job.query, 'status': 'done', 'saved': saved,
+                'seconds': time.monotonic() - start, 'error': None}
+
+    def run(self, jobs: Iterable[HarvestJob]) -> List[dict]:
+        """Runs jobs concurrently (jobs with higher priority are started first)
+
+        Parameters:
+            jobs: harvest jobs
+
+        Return:
+            list with results of jobs (in order of jobs): dictionaries with
+            'query', 'status' ('done' or 'failed'), 'saved' (number of records), 'seconds' and 'error' keys
+        """
+        jobs = list(jobs)
+        if any(job.dedup for job in jobs) and self.__dedup_index is None:
+            self.__dedup_index = DedupIndex()
+        #  stable sorting keeps order of jobs with the same priority
+        order = sorted(range(len(jobs)), key=lambda i: -jobs[i].priority)
+        results = [None] * len(jobs)
+        start = time.monotonic()
+        done = failed = saved = 0
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            futures = {executor.submit(self.__run_job, jobs[i]): i for i in order}
+            for future in as_completed(futures):
+                result = results[futures[future]] = future.result()
+                done += 1
+                failed += result['status'] == 'failed'
+                saved += result['saved'] or 0
+                self.add_log(f"Progress: {done}/{len(jobs)} jobs completed ({failed} failed), "
+                             f"{saved} records saved, {time.monotonic() - start:.0f} seconds", 'INFO')
+        return results
@@ -0,0 +1,297 @@
+"""
+    Imports:
+        os: used for finding harvested files
+        ast: used for parsing list columns of csv-files
+        csv: used for parsing rows of csv-files
+        json: used for storing list columns
+        sqlite3: used for storing full-text index (FTS5)
+        threading: used for safe access to index from several threads
+        pandas: used for returning results as data frames
+"""
+import os
+import ast
+import csv
+import json
+import sqlite3
+import threading
+from typing import Optional, Iterable, Iterator
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from settings import folder, SEARCH_WEIGHTS
+from writers import HEADER
+from analytics import find_files
+
+#  columns of records table in order of HEADER
+COLUMNS = ['type', 'language', 'url', 'title', 'creators', 'source', 'publication_date', 'abstract', 'keywords']
+#  categories which can be counted by local records (names as in 'categories' of settings)
+LOCAL_CATEGORIES = {'keyword': 'keywords', 'pub': 'source', 'year': 'year', 'type': 'type'}
+
+
+class SearchIndex:
+    """Full-text index (SQLite FTS5) of harvested records by title, abstract and keywords
+
+    Index is kept in '<folder>/search.sqlite' and updated incrementally: only rows appended
+    to csv-files and new part-files of parquet datasets since the last update are indexed
+    (records of truncated or rewritten files are indexed again).
+
+    Query syntax (FTS5): words are combined with AND, OR, NOT and brackets, "multi-word phrase",
+    prefix* and column filters 'title: graphene', 'keywords: "machine learning"'.
+    Results are ranked by BM25 (title and keywords weigh more than abstract, see SEARCH_WEIGHTS).
+
+    Methods:
+        update(files):
+            Indexes new records of harvested files
+        search(query, top):
+            Returns the best matching records as data frame
+        count(query):
+            Returns number of matching records
+        statistic(query, category):
+            Returns numbers of matching records by category as data frame
+        close():
+            Closes the index
+
+    Examples:
+        index = SearchIndex()
+        index.update()
+        index.search('"neural networks" AND (graphene OR title: quantum)', top=20)
+        index.statistic('climate NOT economics', 'year')
+    """
+
+    def __init__(self, path: str = os.path.join(folder, 'search.sqlite')):
+        """Initialize method
+
+        Parameters:
+            path: path to SQLite database
+        """
+        self.__lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__connection:
+            #  indexed part of every file (size of csv-file, 1 for part-file of parquet dataset)
+            #  and its signature (the last indexed bytes of csv-file, size and time of part-file)
+            #  used for finding rewritten files
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, position INTEGER, '
+                                      'signature BLOB)')
+            self.__connection.execute(f"CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, "
+                                      f"file TEXT, start INTEGER, {', '.join(COLUMNS)})")
+            self.__connection.execute('CREATE INDEX IF NOT EXISTS records_file ON records (file, start)')
+            self.__connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(title, abstract, "
+                                      "keywords, content='records', content_rowid='id', "
+                                      "tokenize='porter unicode61 remove_diacritics 2')")
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    @staticmethod
+    def __csv_rows(path: str, position: int) -> Iterator[tuple]:
+        """Complete rows of csv-file after position
+
+        Return:
+            generator of (offset of row, offset of the next row, values of row) tuples
+        """
+        with open(path, 'rb') as file:
+            file.seek(position)
+            start, lines = position, []
+            for line in iter(file.readline, b''):
+                lines.append(line)
+                #  quoted values can contain line breaks: row is complete when quotes are balanced
+                if not line.endswith(b'\n') or sum(part.count(b'"') for part in lines) % 2:
+                    continue
+                end = start + sum(map(len, lines))
+                values = next(csv.reader([b''.join(lines).decode('utf-8')]), [])
+                if values != HEADER:
+                    yield start, end, values
+                start, lines = end, []
+
+    @staticmethod
+    def __to_list(value) -> Optional[list]:
+        """List column from csv-file (string representation) or parquet-file"""
+        if value is None or isinstance(value, list):
+            return value
+        if not value:
+            return None
+        try:
+            return list(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            return None
+
+    def __insert(self, path: str, rows: Iterable[tuple]) -> int:
+        """Adds records to index
+
+        Parameters:
+            path: file of records
+            rows: (offset, values in order of HEADER) pairs
+        """
+        records = []
+        for offset, values in rows:
+            values = [value if value != '' else None for value in values] + [None] * (len(COLUMNS) - len(values))
+            creators, keywords = self.__to_list(values[4]), self.__to_list(values[8])
+            values[4] = json.dumps(creators) if creators is not None else None
+            values[8] = '; '.join(keywords) if keywords else None
+            records.append((path, offset, *values[:len(COLUMNS)]))
+        if not records:
+            return 0
+        first = self.__connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM records').fetchone()[0]
+        self.__connection.executemany(f"INSERT INTO records (file, start, {', '.join(COLUMNS)}) "
+                                      f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})", records)
+        self.__connection.execute('INSERT INTO search (rowid, title, abstract, keywords) '
+                                  'SELECT id, title, abstract, keywords FROM records WHERE id >= ?', (first,))
+        return len(records)
+
+    def __remove(self, path: str, offset: int = 0):
+        """Removes records of file starting from offset"""
+        self.__connection.execute("INSERT INTO search (search, rowid, title, abstract, keywords) "
+                                  "SELECT 'delete', id, title, abstract, keywords FROM records "
+                                  "WHERE file = ? AND start >= ?", (path, offset))
+        self.__connection.execute('DELETE FROM records WHERE file = ? AND start >= ?', (path, offset))
+
+    @staticmethod
+    def __csv_signature(path: str, position: int) -> bytes:
+        """The last bytes of csv-file before position"""
+        with open(path, 'rb') as file:
+            file.seek(max(0, position - 256))
+            return file.read(min(position, 256))
+
+    @staticmethod
+    def __part_signature(path: str) -> bytes:
+        """Size and modification time of part-file"""
+        stat = os.stat(path)
+        return f'{stat.st_size}:{stat.st_mtime_ns}'.encode()
+
+    def __update_csv(self, path: str, position: int, signature: Optional[bytes]) -> int:
+        """Indexes rows of csv-file after position"""
+        if position and (os.path.getsize(path) < position or self.__csv_signature(path, position) != signature):
+            #  file was truncated or rewritten (rollback or restart of harvest)
+            self.__remove(path)
+            position = 0
+        added, end = 0, position
+        batch = []
+        for start, end, values in self.__csv_rows(path, position):
+            batch.append((start, values))
+            if len(batch) >= 1000:
+                added += self.__insert(path, batch)
+                batch = []
+        added += self.__insert(path, batch)
+        self.__connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)',
+                                  (path, end, self.__csv_signature(path, end)))
+        return added
+
+    def __update_parquet(self, path: str, indexed: dict) -> int:
+        """Indexes new part-files of parquet dataset and removes records of deleted or rewritten part-files"""
+        if pq is None:
+            raise ImportError("Install 'pyarrow' package to index records in parquet format")
+        parts = {os.path.join(root, name): None for root, _, names in os.walk(path)
+                 for name in names if name.endswith('.parquet')}
+        for part in parts:
+            parts[part] = self.__part_signature(part)
+        for part, signature in indexed.items():
+            if parts.get(part) != signature:
+                self.__remove(part)
+                self.__connection.execute('DELETE FROM files WHERE path = ?', (part,))
+        added = 0
+        for part in sorted(parts):
+            if indexed.get(part) == parts[part]:
+                continue
+            table = pq.read_table(part, columns=HEADER)
+            rows = zip(*(table.column(name).to_pylist() for name in HEADER))
+            added += self.__insert(part, enumerate(rows))
+            self.__connection.execute('INSERT OR REPLACE INTO files VALUES (?, 1, ?)', (part, parts[part]))
+        return added
+
+    def update(self, files: Optional[Iterable[str]] = None) -> int:
+        """Indexes records added to harvested files since the last update
+
+        Parameters:
+            files: csv-files and folders of parquet datasets (None as default - all files in '<folder>')
+
+        Return:
+            number of indexed records
+        """
+        files = list(files) if files is not None else find_files()
+        added = 0
+        with self.__lock, self.__connection:
+            indexed = {path: (position, signature) for path, position, signature
+                       in self.__connection.execute('SELECT path, position, signature FROM files')}
+            for path in files:
+                if path.endswith('.csv'):
+                    added += self.__update_csv(path, *indexed.get(path, (0, None)))
+                else:
+                    prefix = os.path.join(path, '')
+                    added += self.__update_parquet(path, {part: signature for part, (_, signature)
+                                                          in indexed.items() if part.startswith(prefix)})
+        return added
+
+    def __match(self, query: str, sql: str, params: tuple = ()) -> list:
+        """Runs SQL with full-text query (raises ValueError for wrong syntax of query)"""
+        with self.__lock:
+            try:
+                return self.__connection.execute(sql, (query, *params)).fetchall()
+            except sqlite3.OperationalError as exc:
+                raise ValueError(f"Wrong query '{query}': {exc}") from None
+
+    def search(self, query: str, top: Optional[int] = 10) -> pd.DataFrame:
+        """Returns the best matching records
+
+        Parameters:
+            query: full-text query (see class documentation)
+            top: number of returned records (None - all matching records)
+
+        Return:
+            data frame with the same columns as saved files (see 'HEADER' in writers)
+            and 'score' column (higher - better), the best records first
+        """
+        weights = ', '.join(str(float(weight)) for weight in SEARCH_WEIGHTS)
+        rows = self.__match(query, f"SELECT {', '.join(f'r.{name}' for name in COLUMNS)}, "
+                                   f"-bm25(search, {weights}) AS score FROM search "
+                                   f"JOIN records r ON r.id = search.rowid WHERE search MATCH ? "
+                                   f"ORDER BY bm25(search, {weights}) LIMIT ?",
+                            (-1 if top is None else top,))
+        dataframe = pd.DataFrame(rows, columns=COLUMNS + ['score']).rename(columns=dict(zip(COLUMNS, HEADER)))
+        dataframe['creators'] = dataframe['creators'].map(lambda value: json.loads(value) if value else None)
+        dataframe['keywords'] = dataframe['keywords'].map(lambda value: value.split('; ') if value else None)
+        return dataframe
+
+    def count(self, query: str) -> int:
+        """Number of records matching query"""
+        return self.__match(query, 'SELECT COUNT(*) FROM search WHERE search MATCH ?')[0][0]
+
+    def statistic(self, query: str, category: str = 'year', col_name: str = 'count') -> pd.DataFrame:
+        """Numbers of records matching query by category
+        (the same format as create_dataframe_by_category of SpringerSearch)
+
+        Parameters:
+            query: full-text query (see class documentation)
+            category: 'keyword', 'pub', 'year' or 'type'
+            col_name: name of the column with numbers of records
+
+        Return:
+            data frame with category and numbers of records (the biggest first)
+        """
+        if category not in LOCAL_CATEGORIES:
+            raise ValueError(f"Wrong category '{category}'. Possible categories: {list(LOCAL_CATEGORIES)}")
+        column = LOCAL_CATEGORIES[category]
+        if column == 'keywords':
+            rows = self.__match(query, 'SELECT r.keywords FROM search JOIN records r ON r.id = search.rowid '
+                                       'WHERE search MATCH ? AND r.keywords IS NOT NULL')
+            values = pd.Series([keyword for keywords, in rows for keyword in keywords.split('; ')], dtype=object)
+            dataframe = values.value_counts().rename_axis(category).reset_index(name=col_name)
+        else:
+            value = 'SUBSTR(r.publication_date, 1, 4)' if column == 'year' else f'r.{column}'
+            rows = self.__match(query, f'SELECT {value} AS value, COUNT(*) AS number FROM search '
+                                       f'JOIN records r ON r.id = search.rowid WHERE search MATCH ? '
+                                       f'AND value IS NOT NULL GROUP BY value ORDER BY number DESC, value')
+            dataframe = pd.DataFrame(rows, columns=[category, col_name])
+        return dataframe.astype({col_name: 'int'})
+
+    def close(self):
+        """Closes the index"""
+        with self.__lock:
+            self.__connection.close()
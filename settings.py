@@ -4,6 +4,9 @@ LOG_FOLDER = 'logs'
 LOG_LVL = 'DEBUG'  # logger level
 FH_LVL = 'DEBUG'  # to file
 SH_LVL = 'WARNING'  # to console
+LOG_PRINT = False  # print all messages (of any level) to console
+LOG_BATCH = 100  # number of messages written to file at once (ERROR and higher are written immediately)
+LOG_FLUSH_INTERVAL = 2  # max seconds between writes to file
 
 #  path to folder to save records
 folder = 'collected_data'
@@ -38,3 +41,59 @@ disciplines = [
 
 #  possible categories to get statistic with indexes in response
 categories = {'subject': 0, 'keyword': 1, 'pub': 2, 'year': 3, 'country': 4, 'type': 5}
+
+#  API settings
+API_URL = 'https://api.springernature.com/metadata/json'
+REQUEST_TIMEOUT = 30  # seconds to wait for the API response
+WORKERS = 8  # number of pages requested concurrently
+
+#  cache of API responses (stored in '<folder>/cache')
+CACHE_TTL = 24 * 60 * 60  # seconds to keep cached response
+CACHE_SIZE = 512 * 1024 * 1024  # max size of cache in bytes
+
+#  writing of records
+WRITE_BATCH = 500  # number of rows written to file at once
+FLUSH_INTERVAL = 5  # max number of seconds between writes to file
+PARQUET_COMPRESSION = 'zstd'  # compression of parquet-files
+CHECKPOINT_EVERY = 10  # number of pages between saving progress of harvest
+
+#  pipeline of harvest (fetch -> parse -> write)
+PARSERS = 2  # number of parsers of pages (0 - pages are parsed and written by fetching thread)
+PARSE_PROCESSES = False  # parse pages in processes instead of threads (for CPU-heavy parsing)
+PIPELINE_QUEUE = 8  # max number of parsed pages waiting for writer
+
+#  index of saved records (stored in '<folder>/dedup.sqlite')
+DEDUP_CAPACITY = 1_000_000  # expected number of records (size of Bloom filter)
+DEDUP_ERROR_RATE = 0.01  # probability of false positive answer of Bloom filter
+
+#  paging
+PAGE_SIZE = 100  # number of records in 1 request (100 - max)
+MAX_DEPTH = 10000  # deepest record reachable by paging (bigger queries are split by dates)
+STREAM_PAGES = False  # decode records of harvested pages one by one (less memory per page)
+
+#  limits of API key and retries of failed requests
+RATE_LIMIT = 5  # requests per second
+RATE_BURST = 5  # max number of requests made at once
+DAILY_LIMIT = 5000  # requests per day (None - unlimited)
+RETRIES = 5  # number of retries of failed request
+BACKOFF = 1  # initial delay (seconds) between retries, doubled after every retry
+BACKOFF_MAX = 60  # max delay between retries
+JOB_WORKERS = 4  # number of harvests running concurrently (HarvestScheduler)
+
+#  metrics
+METRICS_INTERVAL = 15  # seconds between exports of metrics (MetricsExporter)
+
+#  statistics store
+STATS_HORIZON = 2  # number of recent years (including current one) requested again by collect_statistic_by_years
+
+#  records
+POOL_SIZE = 200_000  # max number of pooled strings of records (keywords, journals, types, languages)
+
+#  offline analytics
+ANALYTICS_CHUNK = 50_000  # number of records read at once from harvested files
+
+#  full-text search
+SEARCH_WEIGHTS = (3, 1, 2)  # weights of title, abstract and keywords in ranking of SearchIndex
+
+#  sync of recurring harvests
+SYNC_OVERLAP = 7  # number of days before watermark requested again by sync_records
@@ -1,37 +1,113 @@
-import csv
 import os
+import re
+import time
+import random
 import datetime
-import json
-from typing import Union, Optional, List, Any
+import email.utils
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Union, Optional, List, Dict, Tuple, Iterator, Callable, Any
 
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
 
-from api_token import TOKEN
-from settings import disciplines, categories, folder
+from settings import disciplines, categories, folder, API_URL, REQUEST_TIMEOUT, WORKERS, CHECKPOINT_EVERY, \
+    PAGE_SIZE, MAX_DEPTH, RETRIES, BACKOFF, BACKOFF_MAX, STREAM_PAGES, SYNC_OVERLAP, PARSERS, PARSE_PROCESSES
 from logger import Logger
+from cache import ResponseCache
+from writers import SINKS
+from records import Record, RecordBatch, parse_record
+from checkpoint import Checkpoint, Watermarks
+from dedup import DedupIndex
+from ratelimit import RateLimiter
+from metrics import Metrics
+from decoding import loads, StreamedPage
+from pipeline import Pipeline, parse_page
+from stats_store import StatisticsStore
 
-#  current date
-now = datetime.datetime.now()
+if TYPE_CHECKING:
+    import pandas as pd
+
+#  statuses of responses to be retried
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_size: int = WORKERS) -> requests.Session:
+    """Creates keep-alive session with connection pool
+
+    Parameters:
+        pool_size: max number of connections kept in pool (number of concurrent requests)
+    """
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_maxsize=pool_size))
+    session.mount('http://', HTTPAdapter(pool_maxsize=pool_size))
+    return session
 
 
 class SpringerSearch(Logger):
     """Class to search info from https://link.springer.com/"""
 
-    def __init__(self, prefix: str = 'Springerlink'):
-        """Initialize method"""
+    def __init__(self, prefix: str = 'Springerlink', workers: int = WORKERS, use_cache: bool = True,
+                 dedup_index: Optional[DedupIndex] = None, rate_limiter: Optional[RateLimiter] = None,
+                 session: Optional[requests.Session] = None, cache: Optional[ResponseCache] = None,
+                 api_url: str = API_URL, token: Optional[str] = None, metrics: Optional[Metrics] = None,
+                 stream: bool = STREAM_PAGES, statistics_store: Optional[StatisticsStore] = None,
+                 parsers: int = PARSERS, parse_processes: bool = PARSE_PROCESSES):
+        """Initialize method
+
+        Parameters:
+            prefix: name of the logger
+            workers: number of pages requested concurrently in get_all_records
+            use_cache: save responses to local cache and reuse them (True as default)
+            dedup_index: index of saved records used by get_all_records with 'dedup' param
+                (None as default - index in '<folder>/dedup.sqlite' is opened on first use)
+            rate_limiter: limiter of requests, can be shared by several instances
+                (None as default - limiter with limits from settings shared by the process)
+            session: session with connection pool, can be shared by several instances
+                (None as default - new session with 'workers' connections)
+            cache: cache of responses, can be shared by several instances
+                (None as default - new cache if 'use_cache' is True)
+            api_url: URL of Springer API (can be replaced with URL of mock server)
+            token: API key (None as default - 'TOKEN' from 'api_token.py' file)
+            metrics: counters and timers of requests and harvests, can be shared by several instances
+                (None as default - new metrics)
+            stream: decode records of harvested pages one by one instead of decoding the whole page
+                (less memory per page)
+            statistics_store: store of statistics by years used by collect_statistic_by_years
+                (None as default - store in '<folder>/statistics.sqlite' is opened on first use)
+            parsers: number of parsers of pages in get_all_records, pages are written by separate thread
+                (0 - pages are parsed and written by fetching thread)
+            parse_processes: parse pages in processes instead of threads (for CPU-heavy parsing)
+        """
         #  create logger
         super().__init__(prefix)
+        #  number of concurrent requests
+        self.__workers = max(1, workers)
+        #  keep-alive session with connection pool shared by all workers
+        self.__session = session or create_session(self.__workers)
         #  query
         self.__query = None
-        #  total number of records for response
-        self.__total_records = 0
-        #  number of shown records in 1 request (100 - max)
-        self.__step = 50
         #  collected data
         self.__data = None
         #  create folder to store data
         os.makedirs(folder, exist_ok=True)
+        #  local cache of responses
+        self.__cache = (cache or ResponseCache()) if use_cache else None
+        #  index of saved records
+        self.__dedup_index = dedup_index
+        #  limits of API key for all requests of instance
+        self.__rate_limiter = rate_limiter or RateLimiter.default()
+        #  API address and key
+        self.__api_url = api_url
+        self.__token = token
+        #  counters and timers of pipeline
+        self.metrics = metrics or Metrics()
+        self.__stream = stream
+        #  statistics of closed years
+        self.__statistics_store = statistics_store
+        #  parsers of pipeline of harvest
+        self.__parsers = parsers
+        self.__parse_processes = parse_processes
 
     @property
     def query(self) -> str:
@@ -51,13 +127,33 @@ class SpringerSearch(Logger):
         """Getter for data attribute"""
         return self.__data
 
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """Getter for cache of responses (None if cache is disabled)"""
+        return self.__cache
+
+    @property
+    def dedup_index(self) -> DedupIndex:
+        """Getter for index of saved records (opened on first use)"""
+        if self.__dedup_index is None:
+            self.__dedup_index = DedupIndex()
+        return self.__dedup_index
+
+    @property
+    def statistics_store(self) -> StatisticsStore:
+        """Getter for store of statistics by years (opened on first use)"""
+        if self.__statistics_store is None:
+            self.__statistics_store = StatisticsStore()
+        return self.__statistics_store
+
     @staticmethod
     def __validate_year(year: int):
         """Validation method for year constraint"""
         if int(year) < 1832:
             raise ValueError("There is no information before 1832")
-        if int(year) > now.year:
-            raise ValueError(f"There is no information for {year}. Current year is {now.year}")
+        current_year = datetime.date.today().year
+        if int(year) > current_year:
+            raise ValueError(f"There is no information for {year}. Current year is {current_year}")
 
     @staticmethod
     def __validate_data(value: str, valid_values: Union[tuple, list, dict], data_type: str):
@@ -141,87 +237,662 @@ class SpringerSearch(Logger):
             Excluding Constraints:
                 constraints = 'journal:"Planta" name:"Smith" -(name:"Fry")'
         """
-        try:
-            #   query string
-            self.query = query
-            url = f'https://api.springernature.com/metadata/json?' \
-                  f'q={self.query}&s={start_from}&p={res_count}&api_key={TOKEN}'
-            print(url)
-            self.add_log(f"Making a '{self.query}' request")
-            #  firs request with only main info
-            response = requests.get(url)
-            print(response.status_code)
-            self.__data = json.loads(response.text)
+        #   query string
+        self.query = query
+        self.add_log(f"Making a '{self.query}' request")
+        self.__data = self.__fetch(self.query, start_from, res_count)
+        if self.__data is not None:
             self.add_log("Response was saved in the 'date' attribute")
-        except Exception as exc:
-            self.add_log(f"Error occurred: {exc}", 'WARNING')
 
-    def get_all_records(self, query: str, total: int = None):
-        """Collect info from all records
+    def __fetch(self, query: str, start_from: int = 1, res_count: int = 0,
+                stream: bool = False) -> Union[dict, StreamedPage, None]:
+        """Make one request to Springer API without changing the state of instance
+        (safe to call from several threads)
+
+        Parameters:
+            query: query-string with URL-coded '&' symbols
+            start_from: return results starting at the number specified
+            res_count: number of results to return in this request
+            stream: return StreamedPage with lazily decoded records instead of decoded response
+
+        Return:
+            decoded response or None if request failed
+        """
+        decode = StreamedPage if stream else loads
+        if self.__cache is not None:
+            content = self.__cache.get(query, start_from, res_count, self.__api_url)
+            if content is not None:
+                self.add_log(f"Response for '{query}' ({start_from}, {res_count}) was taken from cache")
+                self.metrics.inc('cache_hits')
+                with self.metrics.timer('decode'):
+                    return decode(content)
+        url = f'{self.__api_url}?q={query}&s={start_from}&p={res_count}&api_key={self.__get_token()}'
+        for attempt in range(RETRIES + 1):
+            #  delay before the next attempt
+            delay = None
+            response = None
+            #  wait for free token (raises QuotaExceeded if daily limit is reached)
+            self.__rate_limiter.acquire()
+            if attempt:
+                self.metrics.inc('retries')
+            try:
+                self.metrics.inc('requests')
+                with self.metrics.timer('request'):
+                    response = self.__session.get(url, timeout=REQUEST_TIMEOUT)
+                self.metrics.inc('bytes_received', len(response.content))
+                self.add_log(f"Response {response.status_code} for '{query}' ({start_from}, {res_count})")
+                if response.status_code == 200:
+                    with self.metrics.timer('decode'):
+                        data = decode(response.content)
+                    #  save only successful responses
+                    if self.__cache is not None:
+                        self.__cache.put(query, start_from, res_count, response.content, self.__api_url)
+                    return data
+                self.metrics.inc('errors')
+                if response.status_code not in RETRY_STATUSES:
+                    self.add_log(f"Request for '{query}' ({start_from}, {res_count}) failed "
+                                 f"with {response.status_code} status: {response.text[:200]}", 'ERROR')
+                    return None
+                self.add_log(f"Request for '{query}' ({start_from}, {res_count}) failed "
+                             f"with {response.status_code} status", 'WARNING')
+                delay = self.__retry_after(response)
+            except (requests.RequestException, ValueError) as exc:
+                self.metrics.inc('errors')
+                self.add_log(f"Error occurred: {exc}", 'WARNING')
+            if attempt == RETRIES:
+                break
+            if delay is None:
+                #  exponential backoff with full jitter
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF * 2 ** attempt))
+            if response is not None and response.status_code == 429:
+                #  all workers wait when API key is throttled
+                self.__rate_limiter.pause(delay)
+            time.sleep(delay)
+        self.add_log(f"Request for '{query}' ({start_from}, {res_count}) failed after {RETRIES} retries", 'ERROR')
+        return None
+
+    def __get_token(self) -> str:
+        """API key (loaded from 'api_token.py' file on first request if it isn't specified)"""
+        if self.__token is None:
+            from api_token import TOKEN
+            self.__token = TOKEN
+        return self.__token
+
+    @staticmethod
+    def __retry_after(response: requests.Response) -> Optional[float]:
+        """Delay (in seconds) from 'Retry-After' header of response (None if there is no header)"""
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+    def plan_queries(self, query: str, total: int = None) -> Optional[List[str]]:
+        """Splits query by 'onlinedatefrom'/'onlinedateto' windows
+        until all records of every sub-query are reachable by paging (MAX_DEPTH in settings)
+
+        Parameters:
+            query: query-string (examples in get_info_by method)
+            total: limit on total number of records to be found
+                (query isn't split if limit is reachable)
+
+        Examples:
+            Query with 30000 records and 10000 MAX_DEPTH:
+                plan_queries('subject:"Physics" year:"2019"')
+                ['subject:"Physics" year:"2019" onlinedatefrom:"1832-01-01" onlinedateto:"2019-03-12"', ...]
+
+        Return:
+            list of sub-queries (query itself if it isn't needed to be split)
+            or None if request failed
+        """
+        plan = self.__plan(query, total)
+        return None if plan is None else plan[0]
+
+    def __plan(self, query: str, total: int = None) -> Optional[Tuple[List[str], Dict[str, dict]]]:
+        """Splits query by dates (see plan_queries method)
+
+        Return:
+            sub-queries in order of dates and first page of the first sub-query by sub-query (harvest starts
+            from it instead of requesting it again, first pages of other sub-queries aren't kept
+            to keep memory constant) or None if request failed
+        """
+        query = query.replace('&', '%26')
+        step = self.__page_size(total)
+        #  first pages of sub-queries are requested with the same params as in harvest
+        data = self.__fetch(query, 1, step)
+        if data is None:
+            return None
+        available = int(data["result"][0]["total"])
+        if available <= MAX_DEPTH or (total is not None and total <= MAX_DEPTH):
+            return [query], {query: data}
+        #  date window of query
+        dates = dict(re.findall(r'(onlinedatefrom|onlinedateto):"([^"]+)"', query))
+        base = re.sub(r'\s*(onlinedatefrom|onlinedateto):"[^"]+"', '', query).strip()
+        windows = [(datetime.date.fromisoformat(dates.get('onlinedatefrom', '1832-01-01')),
+                    datetime.date.fromisoformat(dates.get('onlinedateto', datetime.date.today().isoformat())))]
+        self.add_log(f"There are {available} records by '{query}' query, it will be split by dates", 'INFO')
+        planned = []
+        #  window, sub-query and first page of the earliest planned sub-query
+        first = None
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            while windows:
+                #  split windows into halves and request both halves concurrently
+                halves = []
+                for date_from, date_to in windows:
+                    middle = date_from + (date_to - date_from) // 2
+                    halves += [(date_from, middle), (middle + datetime.timedelta(days=1), date_to)]
+                windows = []
+                #  only 'workers' pages are received at once
+                for batch in range(0, len(halves), self.__workers):
+                    queries = [(window, f'{base} onlinedatefrom:"{window[0]}" onlinedateto:"{window[1]}"')
+                               for window in halves[batch:batch + self.__workers]]
+                    for (window, sub_query), data in zip(queries, executor.map(
+                            lambda item: self.__fetch(item[1], 1, step), queries)):
+                        if data is None:
+                            return None
+                        sub_total = int(data["result"][0]["total"])
+                        if sub_total == 0:
+                            continue
+                        if sub_total <= MAX_DEPTH or window[0] == window[1]:
+                            if sub_total > MAX_DEPTH:
+                                self.add_log(f"Only {MAX_DEPTH} of {sub_total} records "
+                                             f"are reachable by '{sub_query}' query", 'WARNING')
+                            planned.append((window, sub_query))
+                            if first is None or window < first[0]:
+                                first = (window, sub_query, data)
+                        else:
+                            windows.append(window)
+        #  sub-queries in order of dates
+        planned = [sub_query for _, sub_query in sorted(planned)]
+        self.add_log(f"Query '{query}' was split into {len(planned)} sub-queries", 'INFO')
+        return planned, {first[1]: first[2]} if first else {}
+
+    def get_all_records(self, query: str, total: int = None, sink: str = 'csv', resume: bool = False,
+                        dedup: bool = False) -> int:
+        """Collect info from all records.
+        Pages are requested concurrently (see 'workers' attribute), parsed by pool of parsers and saved
+        by single writer in offset order, stages are connected by bounded queues (see Pipeline in pipeline.py),
+        so slow sink holds parsing and requests back.
+        Query with more records than reachable by paging is split by dates (see plan_queries method).
+        Progress is saved to checkpoint every CHECKPOINT_EVERY pages (see settings)
 
         Parameters:
             query: query-string (examples in get_info_by method)
             total: limit on total number of records to be found
                 (None as default - collecting all possible records)
+            sink: format of saved records: 'csv' (one csv-file) or 'parquet'
+                (compressed parquet-files partitioned by subject and year, requires pyarrow)
+            resume: continue interrupted harvest with the same parameters from the last checkpoint
+                (records saved after checkpoint are removed from file and collected again)
+            dedup: skip records (by DOI or URL) which were already saved by any harvest with 'dedup' param
+                (see 'dedup_index' attribute), they are dropped before parsing
+
+        Raises:
+            ConnectionError: if page can't be received after retries (harvest can be resumed)
+            QuotaExceeded: if daily limit of requests is reached (harvest can be resumed)
+
+        Return:
+            number of saved records (including records saved before resuming)
         """
-        #  request to API
-        self.get_info_by(query)
-        #  getting total records number
-        self.__get_records_number(total)
+        return self.__harvest(query, total, sink, resume, dedup)[0]
+
+    def sync_records(self, query: str, sink: str = 'csv', overlap: int = SYNC_OVERLAP) -> int:
+        """Collect only records which appeared online since the previous sync by the same query
+        and append them to the file of this query (the same file as get_all_records uses).
+        The latest online date of received records (watermark) is saved after every sync,
+        the next sync requests records from watermark minus 'overlap' days,
+        records received again in overlap are skipped by DOI or URL of records saved by syncs of this query
+        (keys are kept in '<folder>/sync', records saved by other harvests aren't skipped).
+        The first sync skips records which were saved to the file by get_all_records with the same query
+
+        Parameters:
+            query: query-string (examples in get_info_by method), 'onlinedatefrom' constraint of query
+                is used only by the first sync
+            sink: format of saved records: 'csv' or 'parquet'
+            overlap: number of days before watermark requested again (records can appear online late)
+
+        Examples:
+            Weekly refresh of discipline:
+                spr.sync_records(spr.create_query(subject='Physics', onlinedatefrom='2020-01-01'))
+
+        Raises:
+            ConnectionError: if page can't be received after retries (sync can be resumed by running it again)
+            QuotaExceeded: if daily limit of requests is reached (sync can be resumed by running it again)
+
+        Return:
+            number of saved records
+        """
+        self.query = query
+        base_query = self.query
+        file_to_save = self.__file_name(base_query)
+        watermarks = Watermarks()
+        watermark = watermarks.get(base_query)
+        if watermark:
+            since = datetime.date.fromisoformat(watermark[:10]) - datetime.timedelta(days=overlap)
+            constraints = re.sub(r'onlinedatefrom:"[^"]*"', '', base_query).strip()
+            query = f'{constraints} onlinedatefrom:"{since.isoformat()}"'
+            self.add_log(f"Sync of '{base_query}' from {since} (watermark {watermark})", 'INFO')
+        else:
+            self.add_log(f"First sync of '{base_query}'", 'INFO')
+        checkpoint_name = f'{file_to_save}.{sink}.sync'
+        #  keys of records saved by syncs of this query
+        dedup_index = DedupIndex(os.path.join(folder, 'sync', f'{file_to_save}.{sink}.sqlite'))
+        try:
+            if not watermark and Checkpoint(checkpoint_name, base_query, total=None, sink=sink).load() is None:
+                #  records saved to the same file by get_all_records aren't saved again
+                self.__index_saved(dedup_index, os.path.join(folder, file_to_save), sink)
+            saved, latest = self.__harvest(query, None, sink, True, True, file_to_save, checkpoint_name, dedup_index)
+        finally:
+            dedup_index.close()
+        watermarks.set(base_query, max(watermark or '', latest))
+        #  the next sync starts from new watermark
+        Checkpoint(checkpoint_name, self.query, total=None, sink=sink).remove()
+        self.add_log(f"Sync of '{base_query}' completed: {saved} new records", 'INFO')
+        return saved
+
+    def __index_saved(self, dedup_index: DedupIndex, full_path: str, sink: str):
+        """Adds keys of records of harvested file to index (file is read by chunks)
+
+        Parameters:
+            dedup_index: index of saved records
+            full_path: name of file with records (without '.csv' extension)
+            sink: format of file: 'csv' or 'parquet'
+        """
+        from analytics import iter_chunks
+
+        path = f'{full_path}.csv' if sink == 'csv' else full_path
+        if not os.path.exists(path):
+            return
+        saved = 0
+        for chunk in iter_chunks(path, ['url']):
+            urls = chunk['url'].dropna()
+            dedup_index.update(key for url in urls for key in dedup_index.get_url_keys(url))
+            saved += len(urls)
+        self.add_log(f"{saved} records of '{path}' were added to index of sync", 'INFO')
+
+    @staticmethod
+    def __file_name(query: str) -> str:
+        """Name of file to save records by query"""
+        return '_'.join(query.replace('"', '').replace(':', '-').split())
+
+    def __harvest(self, query: str, total: Optional[int], sink: str, resume: bool, dedup: bool,
+                  file_to_save: Optional[str] = None, checkpoint_name: Optional[str] = None,
+                  dedup_index: Optional[DedupIndex] = None) -> tuple:
+        """Collect and save records (see get_all_records method)
+
+        Parameters:
+            file_to_save: name of file to save records (None as default - created from query)
+            checkpoint_name: name of checkpoint (None as default - name of file and sink)
+            dedup_index: index of saved records used with 'dedup' param (None as default - 'dedup_index' attribute)
+
+        Return:
+            number of saved records and the latest online date of received records ('' if there are no records)
+        """
+        self.__validate_data(sink, SINKS, 'sink')
+        self.query = query
         #  name of file to save data
-        file_to_save = '_'.join(self.query.replace('"', '').replace(':', '-').split())
+        file_to_save = file_to_save or self.__file_name(self.query)
         full_path = os.path.join(folder, file_to_save)
+        #  progress of harvest
+        checkpoint = Checkpoint(checkpoint_name or f'{file_to_save}.{sink}', self.query, total=total, sink=sink)
+        state = checkpoint.load() if resume else None
+        if state and state.get('done'):
+            self.add_log(f"Harvest by '{self.query}' query is already completed "
+                         f"(run it without 'resume' to harvest again)", 'WARNING')
+            return state['saved'], state.get('latest', '')
+        #  sub-queries reachable by paging and the first page received by planning
+        plan = (state['queries'], {}) if state else self.__plan(self.query, total)
+        if plan is None:
+            raise ConnectionError(f"Can't get records for '{query}' query")
+        queries, first_pages = plan
+        step = self.__page_size(total)
         #  counters
-        total_saved = 0
-        current_record = 1
-        #  counter of iterations without saving new records
-        looped = 0
-        while total_saved < total:
-            count = 0
-            self.add_log(f"Getting {current_record}-{current_record + self.__step} records")
-            #  get records from API
-            self.get_info_by(query, current_record, self.__step)
-            #  go through records
-            for record in self.__data['records']:
+        total_saved = state['saved'] if state else 0
+        #  current sub-query
+        part = state['part'] if state else 0
+        #  offset of the next page to be saved
+        next_offset = state['offset'] if state else 1
+        #  the latest online date of received records
+        latest = state.get('latest', '') if state else ''
+        #  discipline of records (partition for parquet-files)
+        subject = re.search(r'subject:"([^"]+)"', self.query)
+        options = {'subject': subject.group(1).replace('%26', '&')} if sink == 'parquet' and subject else {}
+        dedup_index = (dedup_index or self.dedup_index) if dedup else None
+
+        def commit(**params):
+            """Flushes records, then saves checkpoint and keys of saved records"""
+            checkpoint.save(queries=queries, part=part, offset=next_offset, saved=total_saved, latest=latest,
+                            output=writer.filename, position=writer.position(), **params)
+            if dedup_index is not None:
+                dedup_index.commit(checkpoint)
+
+        with SINKS[sink](full_path, **options) as writer:
+            if state:
+                #  remove records saved after the last checkpoint
+                writer.rollback(state['position'])
+                self.add_log(f"Harvest resumed from {state['offset']} record of {part + 1} sub-query, "
+                             f"{total_saved} records were saved before", 'INFO')
+            else:
+                #  start position of harvest in file
+                commit()
+
+            def save_page(page: tuple) -> bool:
+                """Saves parsed page (runs in writer of pipeline), returns False when limit is reached"""
+                nonlocal part, next_offset, latest, total_saved
+                part, next_offset, errors, rows = page
+                for error in errors:
+                    self.add_log(f"Error during processing the record: {error}")
+                saved = duplicates = 0
+                for key, online_date, row in rows:
+                    latest = max(latest, online_date or '')
+                    #  skip records saved before
+                    if dedup_index is not None and key is not None and not dedup_index.add(key, checkpoint):
+                        duplicates += 1
+                        continue
+                    if row is not None:
+                        writer.write(row)
+                        saved += 1
+                self.metrics.inc('records_duplicated', duplicates)
+                self.metrics.inc('records_written', saved)
+                self.add_log(f"Saved {saved} records at current iteration"
+                             + (f", {duplicates} duplicates skipped" if duplicates else ''))
+                total_saved += saved
+                self.add_log(f"Total saved: {total_saved} of {total or 'all'} records", "INFO")
+                if total is not None and total_saved >= total:
+                    return False
+                if (next_offset - 1) // step % CHECKPOINT_EVERY == 0:
+                    commit()
+                return True
+
+            #  without dedup every valid record is saved, so pages beyond limit aren't needed
+            limit = total - total_saved if total is not None and dedup_index is None else None
+            harvest = self.__iter_harvest(queries, part, next_offset, step, first_pages, limit)
+            pages = harvest
+            if dedup_index is not None:
+                #  records saved before aren't parsed (keys are added by writer together with checkpoints)
+                pages = ((part, offset, self.__new_records(records, dedup_index)) for part, offset, records in pages)
+            if self.__stream:
+                #  streamed records are parsed one by one by fetching thread (list of records isn't built)
+                pipeline = Pipeline(parse_page, save_page, 0, metrics=self.metrics)
+            else:
+                pipeline = Pipeline(parse_page, save_page, self.__parsers, self.__parse_processes,
+                                    metrics=self.metrics)
+                #  records of page are received before the next page is requested
+                pages = ((*page[:2], list(page[2])) for page in pages)
+            try:
+                pipeline.run(pages)
+                harvest.close()
+                commit(done=True)
+            except BaseException:
+                #  keys of records which are not in checkpoint
+                if dedup_index is not None:
+                    dedup_index.rollback(checkpoint)
+                raise
+            finally:
+                self.add_log(pipeline.report(), 'INFO')
+        return total_saved, latest
+
+    def iter_records(self, query: str, total: int = None, dedup: bool = False) -> Iterator[Record]:
+        """Lazily collect info from records page by page.
+        Only pages requested concurrently (see 'workers' attribute) are kept in memory,
+        so records can be streamed to any consumer with constant memory
+
+        Parameters:
+            query: query-string (examples in get_info_by method)
+            total: limit on total number of records to be yielded
+                (None as default - collecting all possible records)
+            dedup: skip records (by DOI or URL) which were already saved by any harvest with 'dedup' param
+                (see 'dedup_index' attribute), yielded records are added to index
+
+        Examples:
+            Stream records to database:
+                for record in spr.iter_records('subject:"Physics" year:"2021"'):
+                    cursor.execute('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', record)
+
+            Save filtered records with one of writers:
+                with CsvWriter('collected_data/english') as writer:
+                    for record in spr.iter_records('subject:"Physics"', total=1000):
+                        if record.language == 'en':
+                            writer.write(record)
+
+        Raises:
+            ConnectionError: if page can't be received after retries
+            QuotaExceeded: if daily limit of requests is reached
+
+        Return:
+            generator of records with summary information (Record tuples, see 'HEADER' in writers)
+        """
+        query = query.replace('&', '%26')
+        plan = self.__plan(query, total)
+        if plan is None:
+            raise ConnectionError(f"Can't get records for '{query}' query")
+        queries, first_pages = plan
+        dedup_index = self.dedup_index if dedup else None
+        #  owner of keys added to index
+        owner = object()
+        left = total
+        try:
+            for _, _, records in self.__iter_harvest(queries, step=self.__page_size(total), first_pages=first_pages,
+                                                     limit=total if dedup_index is None else None):
+                for record in records:
+                    #  skip records saved before
+                    if dedup_index is not None and not self.__is_new(record, dedup_index, owner):
+                        self.metrics.inc('records_duplicated')
+                        continue
+                    with self.metrics.timer('parse'):
+                        row = self.__parse_records(record)
+                    #  records which can't be parsed are skipped (errors are logged)
+                    if row is None:
+                        continue
+                    yield row
+                    if left is not None:
+                        left -= 1
+                        if left <= 0:
+                            return
+        finally:
+            #  keys of yielded records
+            if dedup_index is not None:
+                dedup_index.commit(owner)
+
+    def create_dataframe_by_records(self, query: str, total: int = None, dedup: bool = False,
+                                    categorical: bool = True) -> 'pd.DataFrame':
+        """Collect records into data frame in memory (without saving them to file)
+
+        Parameters:
+            query: query-string (examples in get_info_by method)
+            total: limit on total number of records (None as default - collecting all possible records)
+            dedup: skip records which were already saved by any harvest with 'dedup' param
+            categorical: store type, language and source of records as categories (True as default)
+
+        Examples:
+            Records by keywords:
+                df = spr.create_dataframe_by_records('subject:"Physics" year:"2021"', total=5000)
+                df.explode('keywords')['keywords'].value_counts()
+
+        Return:
+            data frame with the same columns as saved files (see 'HEADER' in writers)
+        """
+        batch = RecordBatch(self.iter_records(query, total, dedup))
+        self.add_log(f"DataFrame with {len(batch)} records created", 'INFO')
+        return batch.to_dataframe(categorical)
+
+    def __iter_harvest(self, queries: List[str], part: int = 0, start_from: int = 1, step: int = PAGE_SIZE,
+                       first_pages: Optional[Dict[str, dict]] = None, limit: Optional[int] = None):
+        """Goes through pages of sub-queries and yields valid records (with 'keywords' or 'abstract') of every page
+
+        Parameters:
+            queries: sub-queries returned by plan_queries method
+            part: index of the first sub-query
+            start_from: offset of the first page in the first sub-query
+            step: number of records in 1 page
+            first_pages: first pages of sub-queries received by planning (they aren't requested again)
+            limit: number of valid records after which harvest stops (None - all records),
+                pages beyond limit aren't requested in advance
+
+        Return:
+            generator of (index of sub-query, offset of the next page, iterator of valid records) tuples,
+            records of page must be consumed before the next page is requested from generator
+        """
+        #  number of valid records of consumed pages
+        kept = 0
+        while part < len(queries):
+            #  counter of iterations without valid records
+            looped = 0
+            first_page = first_pages.pop(queries[part], None) if first_pages and start_from == 1 else None
+            pages = self.__iter_pages(queries[part], start_from, step, first_page,
+                                      None if limit is None else lambda: limit - kept)
+            for current_record, data in pages:
+                self.add_log(f"Getting {current_record}-{current_record + step} records")
                 #  take valid records by 'keyword' key
-                if any(k in record.keys() for k in ['keywords', 'keyword', 'abstract']):
-                    #  create dict with main information from record
-                    rec_info = self.__parse_records(record)
-                    #  save
-                    self.__save_record(rec_info, full_path)
-                    count += 1
-            self.add_log(f"Saved {count} records at current iteration")
-            total_saved += count
-            looped += 1 if count == 0 else 0
-            #  after 5 iterations without new records - break the loop
-            if looped > 5:
-                self.add_log("There are no new records. Break the loop", 'INFO')
-                break
-            self.add_log(f"Total saved: {total_saved} of {self.__total_records} records", "INFO")
-            current_record += self.__step
+                counts = {'received': 0, 'kept': 0}
+                yield part, current_record + step, self.__valid_records(data.get('records', []), counts)
+                self.metrics.inc('records_received', counts['received'])
+                self.metrics.inc('records_kept', counts['kept'])
+                self.metrics.inc('records_discarded', counts['received'] - counts['kept'])
+                kept += counts['kept']
+                if limit is not None and kept >= limit:
+                    pages.close()
+                    return
+                looped += 1 if not counts['kept'] else 0
+                #  after 5 iterations without new records - break the loop
+                if looped > 5:
+                    self.add_log("There are no new records. Break the loop", 'INFO')
+                    break
+            pages.close()
+            #  next sub-query
+            part += 1
+            start_from = 1
 
-    def __get_records_number(self, total: int = None):
-        """Gets the total number of records by request and set iteration step
+    @staticmethod
+    def __valid_records(records: Iterator[dict], counts: dict) -> Iterator[dict]:
+        """Yields records with 'keywords' or 'abstract' and counts received and kept records
 
         Parameters:
-            total: limit on total number of records to be found (sets in _get_all_records method)
+            records: records of page (list or iterator of streamed page)
+            counts: dictionary with 'received' and 'kept' counters
         """
-        #  getting the total records number
-        if total:
-            self.__total_records = total
-            self.__step = min(self.__step, total)
-        else:
-            self.__total_records = int(self.data["result"][0]["total"])
-        self.add_log(f"There are {self.__total_records} records to parse", 'INFO')
+        for record in records:
+            counts['received'] += 1
+            if any(k in record.keys() for k in ['keywords', 'keyword', 'abstract']):
+                counts['kept'] += 1
+                yield record
+
+    def __new_records(self, records: Iterator[dict], dedup_index: DedupIndex) -> Iterator[dict]:
+        """Yields records which are not in index of saved records (index isn't changed) and counts duplicates
+
+        Parameters:
+            records: records of page (list or iterator of streamed page)
+            dedup_index: index of saved records
+        """
+        duplicates = 0
+        try:
+            for record in records:
+                key = dedup_index.get_key(record)
+                if key is not None and key in dedup_index:
+                    duplicates += 1
+                    continue
+                yield record
+        finally:
+            self.metrics.inc('records_duplicated', duplicates)
+
+    @staticmethod
+    def __is_new(record: dict, dedup_index: DedupIndex, owner: Any = None) -> bool:
+        """Checks record in index of saved records and adds it to index
+
+        Parameters:
+            record: dictionary with all info about record
+            dedup_index: index of saved records
+            owner: harvest which adds key of record to index
+        """
+        key = dedup_index.get_key(record)
+        return key is None or dedup_index.add(key, owner)
+
+    @staticmethod
+    def __page_size(total: int = None) -> int:
+        """Number of records requested in 1 page
+
+        Parameters:
+            total: limit on total number of records to be found
+        """
+        return min(PAGE_SIZE, total) if total else PAGE_SIZE
+
+    def __iter_pages(self, query: str, start_from: int = 1, step: int = PAGE_SIZE, first_page: Optional[dict] = None,
+                     needed: Optional[Callable[[], int]] = None):
+        """Requests pages concurrently (up to 'workers' pages in flight) and yields them in offset order.
+        Number of records is taken from the first page, pages deeper than MAX_DEPTH aren't requested
+
+        Parameters:
+            query: query-string with URL-coded '&' symbols
+            start_from: offset of the first page
+            step: number of records in 1 page
+            first_page: page at 'start_from' offset if it is already received
+            needed: function returning number of records still needed by consumer
+                (None - all records), pages which can't be needed aren't requested in advance
+
+        Raises:
+            ConnectionError: if page can't be received after retries
+
+        Return:
+            generator of (offset, decoded response) pairs
+        """
+        data = first_page if first_page is not None else self.__fetch(query, start_from, step, self.__stream)
+        if data is None:
+            raise ConnectionError(f"Can't get {start_from}-{start_from + step} records by '{query}' query")
+        #  number of reachable records by query
+        available = min(int(data["result"][0]["total"]), MAX_DEPTH)
+        self.add_log(f"There are {available} records to parse by '{query}' query", 'INFO')
+        #  offset of the next page to request and offset of the next page to yield
+        start = consumed = start_from + step
+        #  requested pages (offset, future) in offset order
+        pages = deque()
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            try:
+                yield start_from, data
+                while True:
+                    #  keep up to 'workers' pages in flight
+                    while len(pages) < self.__workers and start <= available:
+                        #  records of pages in flight cover needed records
+                        if pages and needed is not None and start - consumed >= needed():
+                            break
+                        pages.append((start, executor.submit(self.__fetch, query, start, step, self.__stream)))
+                        start += step
+                    if not pages:
+                        self.add_log("All available records were processed", 'INFO')
+                        break
+                    current_record, page = pages.popleft()
+                    data = page.result()
+                    if data is None:
+                        #  harvest can be resumed from checkpoint
+                        raise ConnectionError(f"Can't get {current_record}-{current_record + step} records "
+                                              f"by '{query}' query")
+                    yield current_record, data
+                    consumed = current_record + step
+            finally:
+                #  pages that are not needed anymore
+                for _, page in pages:
+                    page.cancel()
 
     def __get_main_info(self):
-        """Return summary information for request"""
+        """Return summary information for request
+
+        Raises:
+            ConnectionError: if response wasn't received after retries
+        """
+        if self.data is None:
+            raise ConnectionError(f"Can't get info for '{self.query}' query")
         return self.data["facets"]
 
-    def collect_statistic_by_years(self, discipline: str, category: str = 'subject',
-                                   from_: Union[int, str] = 2003, to_: Union[int, str] = now.year,
-                                   set_index: bool = False) -> pd.DataFrame:
-        """Collect statistic by specified discipline and category in the specified range of years
+    def collect_statistic_by_years(self, discipline: str, category: Union[str, List[str]] = 'subject',
+                                   from_: Union[int, str] = 2003, to_: Union[int, str, None] = None,
+                                   set_index: bool = False,
+                                   refresh: bool = False) -> Union['pd.DataFrame', Dict[str, 'pd.DataFrame']]:
+        """Collect statistic by specified discipline and category in the specified range of years.
+        Statistics of closed years (older than STATS_HORIZON recent years) are taken from statistics store
 
         Parameters:
             discipline: the scientific field. Possible disciplines:
@@ -231,10 +902,13 @@ class SpringerSearch(Logger):
                     'Pharmacy', 'Philosophy', 'Physics', 'Political Science and International Relations',
                     'Psychology', 'Social Sciences', 'Statistics'
             category: the category for which statistics will be collected ('subject' as default).
-                Possible categories: 'subject', 'keyword', 'pub', 'year', 'country', 'type'
+                Possible categories: 'subject', 'keyword', 'pub', 'year', 'country', 'type'.
+                List of categories or 'all' - collect statistics by several categories
+                with one request per year
             from_: the date(year) from which statistics will be collected (no info before 2003 - default value)
             to_: last date(year) (included) - current year as default
             set_index: set 'category' column as index of data frame (False as default)
+            refresh: request all years again and update statistics store (False as default)
 
         Examples:
             Using only discipline: get counts of publication by sections for 'Medicine & Public Health':
@@ -244,138 +918,163 @@ class SpringerSearch(Logger):
             from 2019 to current year:
                     df = collect_statistic_by_years('Computer Science', category='country', from_year=2019)
 
+            Using several categories: get counts of publication by countries and keywords:
+                    dfs = collect_statistic_by_years('Computer Science', category=['country', 'keyword'])
+                    dfs['country']
+
         Return:
             data frame with collected statistic
+            (dictionary {category: data frame} for several categories)
         """
+        import pandas as pd
+
         #  validate discipline
         self.__validate_data(discipline, disciplines, 'discipline')
-        #  validate category
-        self.__validate_data(category, categories, 'category')
+        #  validate categories
+        catgs = self.__get_categories(category)
         #  validate years values
+        to_ = to_ or datetime.date.today().year
         self.__validate_year(from_)
         self.__validate_year(to_)
-        #  create dataframe with target column
-        dt_frame = pd.DataFrame(columns=[category])
-        #  go through years
-        for yr in range(from_, to_ + 1):
-            #  create another df by year
-            tmp_df = self.create_dataframe_by_category(category,
-                                                       col_name=f'count_{yr}',
-                                                       subject=discipline, year=yr)
-            #  merge to main
-            dt_frame = dt_frame.merge(tmp_df, how='right')
-            self.add_log(f"Info for {yr} year added to data frame")
-        #  processing dataframe
-        dt_frame.fillna(0, inplace=True)
-        dt_frame.iloc[:, 1:] = dt_frame.iloc[:, 1:].astype('int')
-        if set_index:
-            dt_frame.set_index(category, inplace=True)
-
-        title = f"{discipline}_by_'{category}'_from_'{from_}'_to_'{to_}'"
-        self.add_log(f"Done! DataFrame for '{title}' created", 'INFO')
-        return dt_frame
-
-    def create_dataframe_by_category(self, catg: str, query: str = None,
-                                     col_name: str = 'count', **kwargs) -> pd.DataFrame:
+        years = list(range(int(from_), int(to_) + 1))
+        store = self.statistics_store
+        key = self.create_query(subject=discipline)
+        #  statistics of every year: {year: {category: [(value, count), ...]}}
+        stats = {}
+        if not refresh:
+            for yr in filter(store.is_closed, years):
+                stored = {catg: store.get(key, catg, yr) for catg in catgs}
+                if all(rows is not None for rows in stored.values()):
+                    stats[yr] = stored
+        if stats:
+            self.add_log(f"Statistics for {len(stats)} years taken from statistics store", 'INFO')
+        #  one request per year (for all categories), years are requested concurrently
+        missing = [yr for yr in years if yr not in stats]
+        queries = [self.create_query(subject=discipline, year=yr) for yr in missing]
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            responses = list(executor.map(lambda qr: self.__fetch(qr.replace('&', '%26')), queries))
+        for yr, response in zip(missing, responses):
+            if response is None:
+                raise ConnectionError(f"Can't get statistic for {yr} year")
+            self.add_log(f"Info for {yr} year received")
+            #  all categories of response are saved
+            store.put(key, yr, response['facets'])
+            stats[yr] = {catg: [(item['value'], int(item['count']))
+                                for item in response['facets'][categories[catg]]['values']] for catg in catgs}
+        dt_frames = {}
+        for catg in catgs:
+            #  long dataframe for all years (the last year first to keep its order of values)
+            long_frame = pd.concat([pd.DataFrame(stats[yr][catg], columns=[catg, 'count']).assign(year=yr)
+                                    for yr in reversed(years)], ignore_index=True)
+            #  wide dataframe: value of category in rows, years in columns
+            dt_frame = long_frame.pivot_table(index=catg, columns='year', values='count',
+                                              aggfunc='sum', fill_value=0, sort=False). \
+                reindex(columns=years, fill_value=0).astype('int')
+            dt_frame.columns = [f'count_{yr}' for yr in years]
+            dt_frame.columns.name = None
+            dt_frames[catg] = dt_frame if set_index else dt_frame.reset_index()
+
+            title = f"{discipline}_by_'{catg}'_from_'{from_}'_to_'{to_}'"
+            self.add_log(f"Done! DataFrame for '{title}' created", 'INFO')
+        return dt_frames if self.__is_multiple(category) else dt_frames[category]
+
+    def create_dataframe_by_category(self, catg: Union[str, List[str]], query: str = None,
+                                     col_name: str = 'count', long_format: bool = False,
+                                     **kwargs) -> Union['pd.DataFrame', Dict[str, 'pd.DataFrame']]:
         """
         Create dataframe with numbers of publications by category with specified query
 
         Parameters:
             catg: category to collect statistics by
+                (list of categories or 'all' - statistics by several categories from one request)
             query: query-string for SpringerAPI
             col_name: name of the column with stored data
+            long_format: return one dataframe with 'category', 'value' and 'col_name' columns
+                for all specified categories (False as default)
             kwargs: named arguments for creating query
 
+        Examples:
+            Numbers of publications by countries and keywords:
+                dfs = create_dataframe_by_category(['country', 'keyword'], year=2021)
+
+            The same in one dataframe:
+                df = create_dataframe_by_category(['country', 'keyword'], long_format=True, year=2021)
+
+        Raises:
+            ConnectionError: if response can't be received after retries
+
         Return:
             dataframe with numbers of publications by specified category
+            (dictionary {category: dataframe} for several categories)
         """
+        import pandas as pd
+
+        catgs = self.__get_categories(catg)
         query = query if query else self.create_query(**kwargs)
         self.get_info_by(query)
         data = self.__get_main_info()
-        dataframe = pd.read_json(json.dumps(data[categories[catg]]['values'])). \
-            rename(columns={"value": catg, "count": col_name})
-        return dataframe
+        dataframes = {c: self.__frame_by_category(data, c, col_name) for c in catgs}
+        if long_format:
+            return pd.concat([df.rename(columns={c: 'value'}).assign(category=c)
+                              for c, df in dataframes.items()],
+                             ignore_index=True)[['category', 'value', col_name]]
+        return dataframes if self.__is_multiple(catg) else dataframes[catg]
 
-    def __parse_records(self, record: dict) -> tuple:
-        """Get the main info about record
+    @staticmethod
+    def __is_multiple(catg: Union[str, List[str]]) -> bool:
+        """Checks if several categories are specified"""
+        return not isinstance(catg, str) or catg == 'all'
 
-        Parameters:
-            record: dictionary with all info about record
+    def __get_categories(self, catg: Union[str, List[str]]) -> List[str]:
+        """Validates category (or list of categories) and returns list of categories
 
-        Return:
-            tuple with summary information
+        Parameters:
+            catg: category, list of categories or 'all'
         """
-        try:
-            summary = (record.get("contentType"),
-                       record.get("language"),
-                       record.get('url')[0]['value'] if record.get('url') else None,
-                       record.get('title'),
-                       self.__get_creators(record),
-                       record.get('publicationName'),
-                       record.get('publicationDate'),
-                       record.get('abstract'),
-                       self.__get_keywords(record)
-                       )
-            return summary
-        except Exception as err:
-            self.add_log(f"Error during processing the record: {err}")
+        if catg == 'all':
+            return list(categories)
+        catgs = [catg] if isinstance(catg, str) else list(catg)
+        for c in catgs:
+            self.__validate_data(c, categories, 'category')
+        return catgs
 
     @staticmethod
-    def __get_keywords(rec: dict) -> Optional[List[Any]]:
-        """Get keywords from record in correct format
+    def __frame_by_category(facets: list, catg: str, col_name: str) -> 'pd.DataFrame':
+        """Create dataframe with numbers of publications by category from facets of response
 
         Parameters:
-            rec: dictionary with all info about record
-
-        Return:
-            list with keywords
+            facets: facets of response
+            catg: category to collect statistics by
+            col_name: name of the column with stored data
         """
-        if any(i not in rec.keys() for i in ['keyword', 'keywords']):
-            return None
-        #  key name
-        key = 'keywords' if 'keywords' in rec.keys() else 'keyword'
-        return list(filter(lambda x: '  ' not in x, rec[key]))
+        import pandas as pd
 
-    @staticmethod
-    def __get_creators(rec) -> Union[list, None]:
-        """Get creators from record
+        dataframe = pd.DataFrame(facets[categories[catg]]['values'], columns=['value', 'count']). \
+            rename(columns={"value": catg, "count": col_name})
+        dataframe[col_name] = dataframe[col_name].astype('int')
+        return dataframe
+
+    def __parse_records(self, record: dict) -> Optional[Record]:
+        """Get the main info about record
 
         Parameters:
-            rec: dictionary with all info about record
+            record: dictionary with all info about record
 
         Return:
-            list with creators
+            record with summary information (repeated strings are pooled) or None if record can't be parsed
         """
-        creators = rec.get('creators')
-        if isinstance(creators, dict):
-            return [i['creator'] for i in creators]
-        elif isinstance(creators, list):
-            return creators
-        return None
-
-    @staticmethod
-    def __save_record(record: tuple, filename: str):
-        """Save info to csv-file
-
-        Parameters:
-            record: dictionary with summary info to be saved
-            filename: name of '.csv' file to save data
-        """
-        filename = f'{filename}.csv'
-        with open(filename, 'a', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            #  if file is empty - write labels
-            if os.stat(filename).st_size == 0:
-                writer.writerow(
-                    ['type', 'language', 'url', 'title', 'creators',
-                     'source/applicant', 'publication_date', 'abstract', 'keywords'])
-            writer.writerow(record)
+        try:
+            return parse_record(record)
+        except Exception as err:
+            self.add_log(f"Error during processing the record: {err}")
 
 
 if __name__ == '__main__':
+    from scheduler import HarvestScheduler, HarvestJob
+
     spr = SpringerSearch()
-    for yr in range(2000, 2023):
-        qry = spr.create_query(subject='Computer Science',
-                               year=yr
-                               )
-        spr.get_all_records(qry, total=5000)
+    jobs = [HarvestJob(spr.create_query(subject='Computer Science',
+                                        year=yr
+                                        ), total=5000)
+            for yr in range(2000, 2023)]
+    HarvestScheduler().run(jobs)
@@ -0,0 +1,136 @@
+"""
+    Imports:
+        os: used for interact with file system
+        time: used for saving time of update
+        sqlite3: used for storing statistics
+        datetime: used for checking whether year is closed
+        threading: used for safe access to store from several threads
+"""
+import os
+import time
+import sqlite3
+import datetime
+import threading
+from typing import Optional, List, Iterable
+
+from settings import folder, categories, STATS_HORIZON
+
+
+class StatisticsStore:
+    """Persistent store of statistics (numbers of publications by values of category) by query, category and year
+
+    Statistics of closed years (older than 'horizon' recent years) barely change, so they are taken
+    from the store, only recent years are requested again. Store is kept in '<folder>/statistics.sqlite'.
+
+    Methods:
+        is_closed(year):
+            Checks whether statistics of year are served from the store
+        get(query, category, year):
+            Returns stored pairs (value, count) or None
+        put(query, year, facets):
+            Saves statistics of all categories from facets of response
+        invalidate(query, category, years):
+            Removes stored statistics (all by default)
+        close():
+            Closes the store
+
+    Examples:
+        Refresh all stored statistics of 'Physics':
+            spr.statistics_store.invalidate(spr.create_query(subject='Physics'))
+    """
+
+    def __init__(self, path: str = os.path.join(folder, 'statistics.sqlite'), horizon: int = STATS_HORIZON):
+        """Initialize method
+
+        Parameters:
+            path: path to SQLite database
+            horizon: number of recent years (including current one) which are always requested
+        """
+        self.horizon = horizon
+        self.__lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        #  years of query with stored statistics (category can have no values)
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS years (query TEXT, category TEXT, year INTEGER, '
+                                  'updated REAL, PRIMARY KEY (query, category, year)) WITHOUT ROWID')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS counts (query TEXT, category TEXT, year INTEGER, '
+                                  'position INTEGER, value TEXT, count INTEGER, '
+                                  'PRIMARY KEY (query, category, year, position)) WITHOUT ROWID')
+        self.__connection.commit()
+
+    def is_closed(self, year: int) -> bool:
+        """Checks whether statistics of year are served from the store
+
+        Parameters:
+            year: year of statistics
+        """
+        return int(year) <= datetime.date.today().year - self.horizon
+
+    def get(self, query: str, category: str, year: int) -> Optional[List[tuple]]:
+        """Returns stored statistics
+
+        Parameters:
+            query: query without year constraint
+            category: category of statistics
+            year: year of statistics
+
+        Return:
+            list of (value, count) pairs in order of API response or None if there is no statistics
+        """
+        with self.__lock:
+            if self.__connection.execute('SELECT 1 FROM years WHERE query = ? AND category = ? AND year = ?',
+                                         (query, category, int(year))).fetchone() is None:
+                return None
+            return self.__connection.execute('SELECT value, count FROM counts '
+                                             'WHERE query = ? AND category = ? AND year = ? ORDER BY position',
+                                             (query, category, int(year))).fetchall()
+
+    def put(self, query: str, year: int, facets: list):
+        """Saves statistics of all categories from facets of response
+
+        Parameters:
+            query: query without year constraint
+            year: year of statistics
+            facets: facets of response
+        """
+        updated = time.time()
+        with self.__lock, self.__connection:
+            for category, position in categories.items():
+                key = (query, category, int(year))
+                self.__connection.execute('DELETE FROM counts WHERE query = ? AND category = ? AND year = ?', key)
+                self.__connection.executemany('INSERT INTO counts VALUES (?, ?, ?, ?, ?, ?)',
+                                              [(*key, i, item['value'], int(item['count']))
+                                               for i, item in enumerate(facets[position]['values'])])
+                self.__connection.execute('INSERT OR REPLACE INTO years VALUES (?, ?, ?, ?)', (*key, updated))
+
+    def invalidate(self, query: Optional[str] = None, category: Optional[str] = None,
+                   years: Optional[Iterable[int]] = None) -> int:
+        """Removes stored statistics (all by default)
+
+        Parameters:
+            query: query without year constraint (None - all queries)
+            category: category of statistics (None - all categories)
+            years: years of statistics (None - all years)
+
+        Return:
+            number of removed (query, category, year) entries
+        """
+        conditions, params = [], []
+        for name, value in (('query', query), ('category', category)):
+            if value is not None:
+                conditions.append(f'{name} = ?')
+                params.append(value)
+        if years is not None:
+            years = [int(year) for year in years]
+            conditions.append(f"year IN ({', '.join('?' * len(years))})")
+            params += years
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self.__lock, self.__connection:
+            self.__connection.execute(f'DELETE FROM counts{where}', params)
+            return self.__connection.execute(f'DELETE FROM years{where}', params).rowcount
+
+    def close(self):
+        """Closes the store"""
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,22 @@
+"""
+    Fixtures of tests: every test runs in its own temporary folder,
+    so '<folder>' with harvested files, checkpoints and indexes is created there
+
+    Imports:
+        os: used for finding modules of repository
+        sys: used for importing modules of repository
+        pytest: used for fixtures
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Temporary working folder of test"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
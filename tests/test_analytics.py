@@ -0,0 +1,27 @@
+import csv
+
+from analytics import CorpusAnalytics
+from writers import HEADER
+
+
+def write_baseline_csv(path: str):
+    """Csv-file in format of the first versions of harvest (creators are saved as list of dictionaries)"""
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        writer.writerow(['Article', 'en', 'http://dx.doi.org/1', 'First', [{'creator': 'Smith, J.'},
+                         {'creator': "O'Brien, K."}], 'Journal A', '2020-01-01', 'Abstract', ['Physics', "Ohm's law"]])
+        writer.writerow(['Article', 'en', 'http://dx.doi.org/2', 'Second', [{'creator': 'Smith, J.'}],
+                         'Journal A', '2021-01-01', 'Abstract', None])
+
+
+def test_creator_counts_of_baseline_file():
+    write_baseline_csv('baseline.csv')
+    counts = CorpusAnalytics(['baseline.csv']).creator_counts()
+    assert counts.to_dict() == {'Smith, J.': 2, "O'Brien, K.": 1}
+
+
+def test_keyword_counts_of_baseline_file():
+    write_baseline_csv('baseline.csv')
+    counts = CorpusAnalytics(['baseline.csv']).keyword_counts()
+    assert counts.to_dict() == {'Physics': 1, "Ohm's law": 1}
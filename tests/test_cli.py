@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+from cli import main, load_jobs
+from mock_server import MockSpringerAPI
+
+
+def test_harvest_against_mock_server(capsys):
+    with MockSpringerAPI(total=5000) as api:
+        code = main(['--api-url', api.url, '--token', 'test', 'harvest', 'onlinedatefrom:"2020-01-01"',
+                     '--total', '100'])
+    result = json.loads(capsys.readouterr().out)
+    assert code == 0, result['error']
+    assert result['status'] == 'done' and result['saved'] >= 100
+
+
+def test_job_file_with_unknown_parameters():
+    with open('jobs.json', 'w', encoding='utf-8') as file:
+        json.dump({'worker': 2, 'jobs': [{'query': 'subject:"Physics"'}]}, file)
+    with pytest.raises(ValueError, match="unknown parameters: \\['worker'\\]"):
+        load_jobs('jobs.json')
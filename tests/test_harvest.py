@@ -0,0 +1,222 @@
+import threading
+
+import pytest
+
+import writers
+import springer_search
+from analytics import find_files, iter_chunks
+from mock_server import MockSpringerAPI
+from ratelimit import RateLimiter
+from scheduler import HarvestScheduler, HarvestJob
+from springer_search import SpringerSearch
+
+#  queries are split by dates when they have more records than reachable by paging
+MAX_DEPTH = 1000
+#  about 2600 records, split into several sub-queries
+QUERY = 'onlinedatefrom:"2005-01-01" onlinedateto:"2014-12-31"'
+OTHER_QUERY = 'onlinedatefrom:"2016-01-01" onlinedateto:"2019-12-31"'
+
+
+class Crash(Exception):
+    """Failure injected into writer"""
+
+
+@pytest.fixture(scope='module')
+def api():
+    with MockSpringerAPI(total=6000, max_depth=MAX_DEPTH) as api:
+        yield api
+
+
+@pytest.fixture(autouse=True)
+def max_depth(monkeypatch):
+    monkeypatch.setattr(springer_search, 'MAX_DEPTH', MAX_DEPTH)
+
+
+@pytest.fixture
+def limiter():
+    return RateLimiter(rate=1e9, burst=10 ** 6, daily_limit=None, path='quota.json')
+
+
+def searcher(api, limiter, **params) -> SpringerSearch:
+    return SpringerSearch('Test', 4, use_cache=False, api_url=api.url, token='test', rate_limiter=limiter, **params)
+
+
+def crash_writer(monkeypatch, sink: str, after: int, name: str = ''):
+    """Makes writer fail after 'after' rows written to files with name"""
+    base = writers.SINKS[sink]
+    written = {}
+    lock = threading.Lock()
+
+    class CrashingWriter(base):
+        def write(self, record):
+            if name in self.filename:
+                with lock:
+                    written[self.filename] = written.get(self.filename, 0) + 1
+                    if written[self.filename] > after:
+                        raise Crash(f'crash after {after} rows')
+            super().write(record)
+
+    monkeypatch.setitem(writers.SINKS, sink, CrashingWriter)
+    return lambda: monkeypatch.setitem(writers.SINKS, sink, base)
+
+
+def saved_urls(name: str) -> list:
+    """URLs of records saved to harvested file with name"""
+    path, = [path for path in find_files() if name in path]
+    return [url for chunk in iter_chunks(path, ['url']) for url in chunk['url']]
+
+
+def expected_urls(api, limiter, query: str) -> list:
+    """URLs of all records by query in order of harvest"""
+    return [record.url for record in searcher(api, limiter).iter_records(query)]
+
+
+def file_name(query: str) -> str:
+    return '_'.join(query.replace('"', '').replace(':', '-').split())
+
+
+@pytest.mark.parametrize('dedup', [False, True])
+@pytest.mark.parametrize('sink', ['csv', 'parquet'])
+def test_resume_after_crash(api, limiter, monkeypatch, sink, dedup):
+    restore = crash_writer(monkeypatch, sink, after=1850)
+    with pytest.raises(Crash):
+        searcher(api, limiter).get_all_records(QUERY, sink=sink, dedup=dedup)
+    restore()
+    saved = searcher(api, limiter).get_all_records(QUERY, sink=sink, resume=True, dedup=dedup)
+
+    urls = saved_urls(file_name(QUERY))
+    assert len(urls) == len(set(urls)) == saved
+    assert sorted(urls) == sorted(expected_urls(api, limiter, QUERY))
+
+
+@pytest.mark.parametrize('sink', ['csv', 'parquet'])
+def test_resume_with_limit(api, limiter, monkeypatch, sink):
+    restore = crash_writer(monkeypatch, sink, after=700)
+    with pytest.raises(Crash):
+        searcher(api, limiter).get_all_records(QUERY, total=1500, sink=sink)
+    restore()
+    saved = searcher(api, limiter).get_all_records(QUERY, total=1500, sink=sink, resume=True)
+
+    #  limit is checked after every page
+    assert 1500 <= saved < 1600
+    urls = saved_urls(file_name(QUERY))
+    assert len(urls) == saved
+    assert sorted(urls) == sorted(expected_urls(api, limiter, QUERY)[:saved])
+
+
+def test_completed_harvest_is_not_repeated(api, limiter):
+    spr = searcher(api, limiter)
+    saved = spr.get_all_records(QUERY, dedup=True)
+    requests = api.requests
+    assert spr.get_all_records(QUERY, resume=True, dedup=True) == saved
+    assert api.requests == requests
+    assert len(saved_urls(file_name(QUERY))) == saved
+
+
+def test_dedup_skips_records_of_other_harvests(api, limiter):
+    spr = searcher(api, limiter)
+    first = spr.get_all_records(QUERY, dedup=True)
+    overlapping = 'onlinedatefrom:"2012-01-01" onlinedateto:"2016-12-31"'
+    second = spr.get_all_records(overlapping, dedup=True)
+
+    urls = set(saved_urls(file_name(QUERY))) | set(saved_urls(file_name(overlapping)))
+    assert len(urls) == first + second
+    assert urls == set(expected_urls(api, limiter, QUERY) + expected_urls(api, limiter, overlapping))
+
+
+@pytest.mark.parametrize('dedup', [False, True])
+def test_scheduler_resumes_failed_job(api, limiter, monkeypatch, dedup):
+    jobs = [HarvestJob(QUERY, dedup=dedup), HarvestJob(OTHER_QUERY, dedup=dedup)]
+    restore = crash_writer(monkeypatch, 'csv', after=600, name=file_name(OTHER_QUERY))
+    results = HarvestScheduler(2, 4, limiter, api_url=api.url, token='test').run(jobs)
+    restore()
+    assert [result['status'] for result in results] == ['done', 'failed']
+
+    results = HarvestScheduler(2, 4, limiter, api_url=api.url, token='test').run(jobs)
+    assert [result['status'] for result in results] == ['done', 'done']
+    for query, result in zip((QUERY, OTHER_QUERY), results):
+        urls = saved_urls(file_name(query))
+        assert len(urls) == len(set(urls)) == result['saved']
+        assert sorted(urls) == sorted(expected_urls(api, limiter, query))
+
+
+def test_sync_keeps_records_saved_by_other_harvests(api, limiter):
+    spr = searcher(api, limiter)
+    spr.get_all_records(OTHER_QUERY, dedup=True)
+    query = 'onlinedatefrom:"2015-01-01"'
+    saved = spr.sync_records(query)
+    assert spr.sync_records(query) == 0
+
+    urls = saved_urls(file_name(query))
+    assert len(urls) == len(set(urls)) == saved
+    assert sorted(urls) == sorted(expected_urls(api, limiter, query))
+
+
+def test_iter_records_skips_records_failed_to_parse(api, limiter, monkeypatch):
+    parse = springer_search.parse_record
+
+    def failing_parse(record):
+        if record['url'][0]['value'].endswith('7'):
+            raise ValueError('broken record')
+        return parse(record)
+
+    monkeypatch.setattr(springer_search, 'parse_record', failing_parse)
+    urls = [record.url for record in searcher(api, limiter).iter_records(OTHER_QUERY)]
+    monkeypatch.setattr(springer_search, 'parse_record', parse)
+    assert urls == [url for url in expected_urls(api, limiter, OTHER_QUERY) if not url.endswith('7')]
+
+
+def test_scheduler_repeats_completed_job_without_resume(api, limiter):
+    jobs = [HarvestJob(OTHER_QUERY, total=300)]
+    first, = HarvestScheduler(1, 4, limiter, api_url=api.url, token='test').run(jobs)
+    requests = api.requests
+    again, = HarvestScheduler(1, 4, limiter, api_url=api.url, token='test').run(jobs)
+    assert api.requests == requests and again['saved'] == first['saved']
+    assert len(saved_urls(file_name(OTHER_QUERY))) == first['saved']
+
+    #  records are appended to the file again (responses are taken from cache)
+    repeated, = HarvestScheduler(1, 4, limiter, api_url=api.url, token='test').run([jobs[0]._replace(resume=False)])
+    assert repeated['status'] == 'done'
+    assert len(saved_urls(file_name(OTHER_QUERY))) == first['saved'] + repeated['saved']
+
+
+def test_cached_responses_of_other_api_are_not_used(api, limiter):
+    query = 'onlinedatefrom:"2019-01-01"'
+    spr = SpringerSearch('Test', 4, api_url=api.url, token='test', rate_limiter=limiter)
+    spr.get_info_by(query)
+    with MockSpringerAPI(total=100) as other:
+        other_spr = SpringerSearch('Test', 4, api_url=other.url, token='test', rate_limiter=limiter)
+        other_spr.get_info_by(query)
+        assert other.requests == 1
+    assert other_spr.data['result'][0]['total'] != spr.data['result'][0]['total']
+
+
+@pytest.mark.parametrize('total', [None, 500])
+@pytest.mark.parametrize('sink', ['csv', 'parquet'])
+def test_sync_after_harvest_of_the_same_query(api, limiter, sink, total):
+    spr = searcher(api, limiter)
+    query = 'onlinedatefrom:"2015-01-01"'
+    harvested = spr.get_all_records(query, total=total, sink=sink)
+    synced = spr.sync_records(query, sink=sink)
+    assert synced == 0 if total is None else synced > 0
+
+    urls = saved_urls(file_name(query))
+    assert len(urls) == len(set(urls)) == harvested + synced
+    assert sorted(urls) == sorted(expected_urls(api, limiter, query))
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_records_saved_before_are_not_parsed(api, limiter, monkeypatch, stream):
+    searcher(api, limiter).get_all_records(QUERY, dedup=True)
+    parse, parsed = springer_search.parse_page, []
+
+    def counting_parse(page):
+        page = parse(page)
+        parsed.extend(row for _, _, row in page[-1])
+        return page
+
+    monkeypatch.setattr(springer_search, 'parse_page', counting_parse)
+    spr = searcher(api, limiter, stream=stream)
+    saved = spr.get_all_records('onlinedatefrom:"2012-01-01" onlinedateto:"2016-12-31"', dedup=True)
+    assert 0 < len(parsed) == saved
+    assert spr.metrics.snapshot()['counters']['records_duplicated'] > 0
@@ -0,0 +1,42 @@
+import csv
+
+import pytest
+
+import writers
+from writers import CsvWriter, HEADER
+
+ROWS = [('Article', 'en', 'u1', 'First', None, 'Journal', '2020-01-01', 'Plain abstract', None),
+        ('Article', 'en', 'u2', 'Second "quoted"', None, 'Journal', '2020-01-02', 'Two\r\nlines', None)]
+NEXT_ROW = ('Article', 'en', 'u4', 'Fourth', None, 'Journal', '2020-01-04', 'Abstract', None)
+
+
+def read_rows(path: str) -> list:
+    with open(path, newline='', encoding='utf-8') as file:
+        return [tuple(row) for row in csv.reader(file)]
+
+
+@pytest.mark.parametrize('torn', ['Article,en,u3,"torn\r\n', 'Article,en,u3,"torn\r\nabstract', 'Article,en,u3,Th'])
+@pytest.mark.parametrize('chunk_size', [7, 1024 * 1024])
+def test_torn_last_row_is_removed(monkeypatch, torn, chunk_size):
+    monkeypatch.setattr(writers, 'CHUNK_SIZE', chunk_size)
+    with CsvWriter('records') as writer:
+        for row in ROWS:
+            writer.write(row)
+    with open('records.csv', 'a', newline='', encoding='utf-8') as file:
+        file.write(torn)
+
+    with CsvWriter('records') as writer:
+        writer.write(NEXT_ROW)
+    expected = [tuple('' if value is None else value for value in row) for row in ROWS + [NEXT_ROW]]
+    assert read_rows('records.csv') == [tuple(HEADER)] + expected
+
+
+def test_complete_file_is_not_changed():
+    with CsvWriter('records') as writer:
+        for row in ROWS:
+            writer.write(row)
+    with open('records.csv', 'rb') as file:
+        content = file.read()
+    CsvWriter('records').close()
+    with open('records.csv', 'rb') as file:
+        assert file.read() == content
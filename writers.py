@@ -0,0 +1,298 @@
+"""
+    Imports:
+        os: used for interact with file system
+        re: used for finding ends of rows in csv-file
+        io: used for buffering rows before writing
+        csv: used for writing records in csv format
+        time: used for flushing buffer by time
+        pyarrow (optional): used for writing records in parquet format (imported by ParquetWriter)
+"""
+import os
+import re
+import io
+import csv
+import time
+from typing import Optional
+
+from settings import WRITE_BATCH, FLUSH_INTERVAL, PARQUET_COMPRESSION
+
+#  labels of columns with info about record
+HEADER = ['type', 'language', 'url', 'title', 'creators',
+          'source/applicant', 'publication_date', 'abstract', 'keywords']
+#  number of bytes read at once when csv-file is checked for incomplete row
+CHUNK_SIZE = 1024 * 1024
+
+
+class CsvWriter:
+    """Buffered writer of records to csv-file
+
+    File stays open while writer is used, rows are collected in buffer and written to file
+    by batches (when buffer has 'batch_size' rows or after 'flush_interval' seconds since last flush).
+    Every batch is written with one call and synced to disk, so rows that were flushed
+    are never corrupted by a crash (only rows from the buffer are lost).
+
+    Methods:
+        write(record):
+            Adds record to buffer (flushes buffer if needed)
+        flush():
+            Writes buffer to file
+        position():
+            Returns size of file after flush (used for checkpoints)
+        rollback(position):
+            Removes rows written after position
+        close():
+            Flushes buffer and closes the file
+
+    Examples:
+        with CsvWriter('collected_data/file') as writer:
+            writer.write(record)
+    """
+
+    def __init__(self, filename: str, batch_size: int = WRITE_BATCH, flush_interval: float = FLUSH_INTERVAL):
+        """Initialize method
+
+        Parameters:
+            filename: name of file to save data (without '.csv' extension)
+            batch_size: number of rows written to file at once
+            flush_interval: max number of seconds between flushes
+        """
+        self.filename = f'{filename}.csv'
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        #  rows in buffer
+        self.__buffered = 0
+        self.__buffer = io.StringIO()
+        self.__writer = csv.writer(self.__buffer)
+        self.__file = open(self.filename, 'a', encoding='utf-8', newline='')
+        self.__repair()
+        #  if file is empty - write labels
+        if self.__file.tell() == 0:
+            self.__writer.writerow(HEADER)
+            self.flush()
+        self.__last_flush = time.monotonic()
+
+    def __repair(self):
+        """Removes the last row if it wasn't written completely (e.g. after crash during writing)
+
+        Line breaks inside quoted fields (e.g. in abstracts) aren't ends of rows: the end of row is
+        the line break after even number of quotes since the beginning of file (escaped quote is doubled)
+        """
+        size = self.__file.tell()
+        if size == 0:
+            return
+        with open(self.filename, 'rb+') as file:
+            #  offsets of chunks and parity of quotes before them
+            chunks, quotes = [], 0
+            for offset in range(0, size, CHUNK_SIZE):
+                file.seek(offset)
+                chunks.append((offset, quotes))
+                quotes = (quotes + file.read(CHUNK_SIZE).count(b'"')) % 2
+            file.seek(size - 1)
+            if not quotes and file.read(1) == b'\n':
+                return
+            #  find the end of the last complete row
+            position = None
+            for offset, quotes in reversed(chunks):
+                file.seek(offset)
+                for match in re.finditer(b'["\n]', file.read(CHUNK_SIZE)):
+                    if match.group() == b'"':
+                        quotes ^= 1
+                    elif not quotes:
+                        position = offset + match.end()
+                if position is not None:
+                    break
+            file.truncate(position or 0)
+        self.__file.seek(0, os.SEEK_END)
+
+    def write(self, record: tuple):
+        """Adds record to buffer
+
+        Parameters:
+            record: tuple with summary info to be saved
+        """
+        self.__writer.writerow(record)
+        self.__buffered += 1
+        if self.__buffered >= self.__batch_size or \
+                time.monotonic() - self.__last_flush >= self.__flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered rows to file and syncs it to disk"""
+        data = self.__buffer.getvalue()
+        if data:
+            self.__file.write(data)
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__buffer.seek(0)
+            self.__buffer.truncate()
+        self.__buffered = 0
+        self.__last_flush = time.monotonic()
+
+    def position(self) -> int:
+        """Flushes buffer and returns size of file"""
+        self.flush()
+        return os.fstat(self.__file.fileno()).st_size
+
+    def rollback(self, position: int):
+        """Removes rows written after position (rows from the buffer are removed too)
+
+        Parameters:
+            position: size of file returned by 'position' method
+        Raises:
+            ValueError: if file is shorter than position
+        """
+        self.__buffer.seek(0)
+        self.__buffer.truncate()
+        self.__buffered = 0
+        if os.fstat(self.__file.fileno()).st_size < position:
+            raise ValueError(f"File '{self.filename}' is shorter than saved position {position}")
+        self.__file.truncate(position)
+        self.__file.seek(0, os.SEEK_END)
+
+    def close(self):
+        """Flushes buffer and closes the file"""
+        if not self.__file.closed:
+            self.flush()
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ParquetWriter:
+    """Buffered writer of records to partitioned parquet dataset (requires pyarrow)
+
+    Records are stored in '<filename>' folder with hive-style partitions by subject and year
+    of publication ('<filename>/subject=Physics/year=2019/part-00000.parquet').
+    'creators' and 'keywords' are stored as list columns, files are compressed.
+    Every flush writes new part-files, so files that were written are never changed.
+
+    Methods:
+        write(record):
+            Adds record to buffer (flushes buffer if needed)
+        flush():
+            Writes buffer to new part-files
+        position():
+            Returns number of the next part-file after flush (used for checkpoints)
+        rollback(position):
+            Removes part-files written after position
+        close():
+            Flushes buffer
+
+    Examples:
+        with ParquetWriter('collected_data/file', subject='Physics') as writer:
+            writer.write(record)
+
+        Reading only needed columns:
+            pd.read_parquet('collected_data/file', columns=['title', 'keywords'])
+    """
+
+    def __init__(self, filename: str, subject: Optional[str] = None, batch_size: int = WRITE_BATCH,
+                 flush_interval: float = FLUSH_INTERVAL, compression: str = PARQUET_COMPRESSION):
+        """Initialize method
+
+        Parameters:
+            filename: name of folder to save data
+            subject: discipline of records (partition), None - partition by year only
+            batch_size: number of rows written to file at once
+            flush_interval: max number of seconds between flushes
+            compression: compression codec of parquet-files
+        Raises:
+            ImportError: if pyarrow is not installed
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Install 'pyarrow' package to save records in parquet format") from None
+        self.__pa, self.__pq = pa, pq
+        self.filename = filename
+        self.__subject = subject
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__compression = compression
+        self.__schema = pa.schema([(name, pa.list_(pa.string()) if name in ('creators', 'keywords')
+                                    else pa.string()) for name in HEADER])
+        self.__rows = []
+        os.makedirs(self.filename, exist_ok=True)
+        #  number of the next part-file
+        self.__part = 1 + max((int(name[5:-8]) for _, _, files in os.walk(self.filename) for name in files
+                               if name.startswith('part-') and name.endswith('.parquet')), default=-1)
+        self.__last_flush = time.monotonic()
+
+    @staticmethod
+    def __names(values: Optional[list]) -> Optional[list]:
+        """Converts list of creators/keywords to list of strings"""
+        if values is None:
+            return None
+        return [value['creator'] if isinstance(value, dict) else str(value) for value in values]
+
+    def write(self, record: tuple):
+        """Adds record to buffer
+
+        Parameters:
+            record: tuple with summary info to be saved
+        """
+        self.__rows.append(record)
+        if len(self.__rows) >= self.__batch_size or \
+                time.monotonic() - self.__last_flush >= self.__flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered rows to new part-files (one file for each partition)"""
+        partitions = {}
+        for row in self.__rows:
+            year = row[6][:4] if row[6] else 'unknown'
+            partitions.setdefault(year, []).append(row)
+        for year, rows in partitions.items():
+            folder = self.filename
+            if self.__subject is not None:
+                folder = os.path.join(folder, f'subject={self.__subject}')
+            folder = os.path.join(folder, f'year={year}')
+            os.makedirs(folder, exist_ok=True)
+            columns = {name: [row[i] for row in rows] for i, name in enumerate(HEADER)}
+            columns['creators'] = [self.__names(value) for value in columns['creators']]
+            columns['keywords'] = [self.__names(value) for value in columns['keywords']]
+            table = self.__pa.Table.from_pydict(columns, schema=self.__schema)
+            #  write to temporary file first, so readers never see a partial file
+            part = os.path.join(folder, f'part-{self.__part:05d}.parquet')
+            self.__pq.write_table(table, f'{part}.tmp', compression=self.__compression)
+            os.replace(f'{part}.tmp', part)
+            self.__part += 1
+        self.__rows = []
+        self.__last_flush = time.monotonic()
+
+    def position(self) -> int:
+        """Flushes buffer and returns number of the next part-file"""
+        self.flush()
+        return self.__part
+
+    def rollback(self, position: int):
+        """Removes part-files written after position (rows from the buffer are removed too)
+
+        Parameters:
+            position: number of part-file returned by 'position' method
+        """
+        self.__rows = []
+        for path, _, files in os.walk(self.filename):
+            for name in files:
+                if name.startswith('part-') and name.endswith('.parquet') and int(name[5:-8]) >= position:
+                    os.remove(os.path.join(path, name))
+        self.__part = position
+
+    def close(self):
+        """Flushes buffer"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+#  possible formats of saved records
+SINKS = {'csv': CsvWriter, 'parquet': ParquetWriter}